@@ -1,122 +1,484 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
-from datetime import datetime, timedelta
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime
+from collections import OrderedDict
 import asyncio
+import functools
+import hashlib
+import logging
+import time
+import uuid
+import httpx
+import orjson
 import uvicorn
+from anyio import to_thread
+from starlette.concurrency import run_in_threadpool
 
+import scraper_http
+from cache import QueryCache, RedisCache
 from tigerair_scraper import TigerairScraper
 from config import TigerairConfig
-from models import FlightInfo, FlightSearchResult
+from models import FlightSearchResult
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="虎航機票爬蟲 API",
     description="台灣虎航到日本航班資訊查詢API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# 允許跨域請求
+# 允許跨域請求；API不使用cookie或驗證標頭，關閉credentials後萬用來源不必逐一反射Origin
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=TigerairConfig.API_CORS_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "If-None-Match"],
+    expose_headers=["ETag"],
+    max_age=86400,
 )
 
+# 壓縮較大的回應（多航線查詢結果可達上百KB）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+@app.exception_handler(scraper_http.ScrapeError)
+async def scrape_error_handler(request: Request, exc: scraper_http.ScrapeError):
+    """上游網站查詢失敗時回傳502，其他未預期的例外交由預設處理回傳500"""
+    return ORJSONResponse({"detail": str(exc)}, status_code=502)
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """放寬執行緒池上限，讓多個阻塞的爬蟲呼叫可以同時執行"""
+    to_thread.current_default_thread_limiter().total_tokens = TigerairConfig.API_THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def create_http_client():
+    """建立共用的HTTP連線池，供直接HTTP查詢使用"""
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        headers=TigerairConfig.HEADERS,
+        timeout=TigerairConfig.HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=TigerairConfig.HTTP_MAX_CONNECTIONS)
+    )
+
+@app.on_event("startup")
+async def create_scraper_pool():
+    """建立爬蟲池，讓瀏覽器在多次請求之間重複使用"""
+    app.state.pool = asyncio.Queue()
+    for _ in range(TigerairConfig.API_SCRAPER_POOL_SIZE):
+        app.state.pool.put_nowait(TigerairScraper(headless=True, reuse_driver=True))
+
+@app.on_event("startup")
+async def create_cache():
+    """建立查詢結果快取"""
+    app.state.cache = QueryCache(
+        default_ttl=TigerairConfig.CACHE_TTL,
+        max_size=TigerairConfig.CACHE_MAX_SIZE
+    )
+    # 進行中的爬取工作（快取鍵 -> Task），完成後自動移除
+    app.state.inflight = {}
+    
+    # 設定REDIS_URL時啟用跨worker共用的快取
+    app.state.redis = None
+    if TigerairConfig.REDIS_URL:
+        app.state.redis = RedisCache(
+            TigerairConfig.REDIS_URL,
+            ttl=TigerairConfig.CACHE_TTL,
+            stale_ttl=TigerairConfig.CACHE_STALE_TTL,
+            lock_ttl=TigerairConfig.REDIS_LOCK_TTL
+        )
+
+@app.on_event("startup")
+async def render_static_responses():
+    """預先序列化內容固定的回應，請求時直接回傳"""
+    app.state.root_body = _render({
+        "message": "虎航機票爬蟲 API",
+        "version": "1.0.0",
+        "documentation": "/docs"
+    })
+    app.state.routes_body = _render({"routes": dict(TigerairConfig.ROUTES)})
+    app.state.routes_etag = _etag(app.state.routes_body)
+
+@app.on_event("startup")
+async def create_job_registry():
+    """建立非同步查詢工作的登記表（job_id -> (建立時間, Future)），以及失敗工作的錯誤回應"""
+    app.state.jobs = OrderedDict()
+    app.state.job_errors = {}
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """關閉共用的HTTP連線池"""
+    await app.state.http.aclose()
+
+@app.on_event("shutdown")
+async def close_scraper_pool():
+    """關閉爬蟲池中的瀏覽器"""
+    while not app.state.pool.empty():
+        scraper = app.state.pool.get_nowait()
+        await run_in_threadpool(scraper.close)
+
+@app.on_event("shutdown")
+async def cancel_jobs():
+    """取消尚未完成的查詢工作"""
+    for _, future in app.state.jobs.values():
+        future.cancel()
+
+@app.on_event("shutdown")
+async def close_redis():
+    """關閉Redis連線"""
+    if app.state.redis is not None:
+        await app.state.redis.close()
+
+async def _search(departure: str, arrival: str, departure_date: str,
+                  return_date: Optional[str] = None) -> FlightSearchResult:
+    """
+    優先使用直接HTTP查詢，查詢失敗或未設定端點時改用瀏覽器
+
+    Raises:
+        ScrapeError: 直接HTTP查詢失敗，且改用瀏覽器也沒有取得任何航班
+    """
+    http_error = None
+    if scraper_http.is_enabled():
+        try:
+            return await scraper_http.search_flights(
+                app.state.http, departure, arrival, departure_date, return_date
+            )
+        except scraper_http.ScrapeError as e:
+            logger.warning(f"直接HTTP查詢失敗，改用瀏覽器: {e}")
+            http_error = e
+    
+    scraper = await app.state.pool.get()
+    try:
+        # Selenium為阻塞呼叫，交由執行緒池執行以免卡住事件迴圈
+        # 直接HTTP查詢已在上方嘗試過，這裡只用瀏覽器
+        result = await run_in_threadpool(
+            scraper.search_flights_with_browser,
+            departure=departure,
+            arrival=arrival,
+            departure_date=departure_date,
+            return_date=return_date
+        )
+    finally:
+        app.state.pool.put_nowait(scraper)
+    
+    # 兩種方式都失敗時回報上游錯誤（502），而非回傳沒有航班的成功回應
+    if http_error is not None and result.errors and not result.flights:
+        raise scraper_http.ScrapeError(
+            f"{http_error}；改用瀏覽器也失敗: {'; '.join(result.errors)}"
+        ) from http_error
+    return result
+
+async def _search_routes(routes: List[str], dates: List[str]) -> Dict[str, FlightSearchResult]:
+    """同時搜尋所有航線與日期組合，再依航線合併結果"""
+    pairs = [(route, date) for route in routes for date in dates]
+    
+    # 每個查詢各自向爬蟲池借用瀏覽器，池的大小即為同時爬取的上限
+    outcomes = await asyncio.gather(
+        *(_search(TigerairConfig.ROUTES[route]["from"], TigerairConfig.ROUTES[route]["to"], date)
+          for route, date in pairs),
+        return_exceptions=True
+    )
+    
+    results = {}
+    for (route, date), outcome in zip(pairs, outcomes):
+        route_name = TigerairConfig.ROUTES[route]["route_name"]
+        route_results = results.get(route)
+        if route_results is None:
+            route_results = results[route] = FlightSearchResult()
+            route_results.search_params['route'] = route_name
+        
+        if isinstance(outcome, Exception):
+            route_results.add_error(f"搜尋 {route_name} {date} 失敗: {outcome}")
+            continue
+        
+        for flight in outcome.flights:
+            flight.departure_date = date
+            route_results.add_flight(flight)
+        for error in outcome.errors:
+            route_results.add_error(f"{date}: {error}")
+    
+    return results
+
+def _render(payload: dict) -> bytes:
+    """將回應內容序列化為JSON"""
+    return orjson.dumps(payload)
+
+def _etag(body: bytes) -> str:
+    """以回應內容的雜湊值作為ETag"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def _json_response(request: Request, body: bytes, etag: str) -> Response:
+    """回傳JSON內容；客戶端的 If-None-Match 與ETag相符時回傳304且不帶內容"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+async def _get_or_compute(key: str, compute, background_tasks: BackgroundTasks) -> Tuple[bytes, str]:
+    """
+    依序查詢程序內快取與Redis快取，都未命中時才呼叫 compute() 爬取
+    
+    Args:
+        key: 快取鍵
+        compute: 回傳 (JSON內容, 是否可快取) 的協程函式
+        background_tasks: 用於在回應後更新過期快取
+        
+    Returns:
+        Tuple[bytes, str]: (JSON回應內容, ETag)
+    """
+    entry = await _get_cached(key, compute, background_tasks)
+    if entry is None:
+        entry = await _compute_once(key, compute)
+    return entry
+
+async def _get_cached(key: str, compute, background_tasks: BackgroundTasks) -> Optional[Tuple[bytes, str]]:
+    """只查詢快取，未命中回傳None；Redis資料過期時先回傳舊值並於回應後更新"""
+    # 程序內快取連同ETag一起保存，命中時不必重新計算雜湊
+    entry = app.state.cache.get(key)
+    if entry is not None:
+        return entry
+    
+    redis_cache = app.state.redis
+    if redis_cache is not None:
+        body, fresh = await redis_cache.get(key)
+        if body is not None:
+            entry = (body, _etag(body))
+            if fresh:
+                app.state.cache.set(key, entry)
+            else:
+                # 先回傳過期資料，回應後再於背景更新
+                background_tasks.add_task(_refresh, key, compute)
+            return entry
+    
+    return None
+
+async def _compute_once(key: str, compute) -> Tuple[bytes, str]:
+    """同一查詢同時只有一個請求實際爬取，其餘請求等待同一個結果"""
+    entry = app.state.cache.get(key)
+    if entry is not None:
+        return entry
+    
+    task = app.state.inflight.get(key)
+    if task is None:
+        task = app.state.inflight[key] = asyncio.create_task(_compute_and_store(key, compute))
+        task.add_done_callback(lambda _: app.state.inflight.pop(key, None))
+    
+    # 共用同一個爬取工作，即使結果有錯誤不能快取，等待中的請求也不會各自重爬；
+    # shield 避免某個客戶端中斷連線時連帶取消其他請求正在等待的工作
+    return await asyncio.shield(task)
+
+async def _compute_and_store(key: str, compute) -> Tuple[bytes, str]:
+    """爬取並寫入快取；其他worker正在爬取相同查詢時等待其結果"""
+    redis_cache = app.state.redis
+    lock_token = None
+    if redis_cache is not None:
+        lock_token = await redis_cache.acquire_lock(key)
+        if lock_token is None:
+            body = await redis_cache.wait_for(key)
+            if body is not None:
+                entry = (body, _etag(body))
+                app.state.cache.set(key, entry)
+                return entry
+    
+    try:
+        body, cacheable = await compute()
+        entry = (body, _etag(body))
+        if cacheable:
+            app.state.cache.set(key, entry)
+            if redis_cache is not None:
+                await redis_cache.set(key, body)
+        return entry
+    finally:
+        if lock_token is not None:
+            await redis_cache.release_lock(key, lock_token)
+
+async def _refresh(key: str, compute):
+    """在背景更新已過期的Redis快取"""
+    redis_cache = app.state.redis
+    lock_token = await redis_cache.acquire_lock(key)
+    if lock_token is None:
+        return
+    
+    try:
+        body, cacheable = await compute()
+        if cacheable:
+            app.state.cache.set(key, (body, _etag(body)))
+            await redis_cache.set(key, body)
+    except Exception as e:
+        logger.warning(f"背景更新快取失敗: {e}")
+    finally:
+        await redis_cache.release_lock(key, lock_token)
+
 # 請求模型
 class FlightSearchRequest(BaseModel):
+    # 忽略多餘欄位、建立後不可修改，驗證全程在pydantic-core內完成
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     departure: str
     arrival: str
     departure_date: str
     return_date: Optional[str] = None
 
 class MultipleRoutesRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     routes: List[str]
     dates: List[str]
 
-# 回應模型
-class FlightInfoResponse(BaseModel):
-    flight_number: str
-    departure_time: str
-    arrival_time: str
-    departure_date: str
-    price: Optional[float]
-    seats_available: Optional[bool]
-    time_slot: str
-
 @app.get("/")
 async def root():
     """API根路徑"""
-    return {
-        "message": "虎航機票爬蟲 API",
-        "version": "1.0.0",
-        "documentation": "/docs"
-    }
+    return Response(content=app.state.root_body, media_type="application/json")
 
 @app.get("/routes")
-async def get_routes():
+async def get_routes(request: Request):
     """取得支援的航線"""
-    return {"routes": TigerairConfig.ROUTES}
+    return _json_response(request, app.state.routes_body, app.state.routes_etag)
 
-@app.post("/search")
-async def search_flights(request: FlightSearchRequest):
-    """搜尋單一航線航班"""
-    try:
-        scraper = TigerairScraper(headless=True)
-        result = scraper.search_flights(
+def _single_search(request: FlightSearchRequest):
+    """組成單一航線查詢的快取鍵與爬取函式"""
+    key = f"v1:tigerair:search:{request.departure}:{request.arrival}:{request.departure_date}:{request.return_date}"
+    
+    async def compute():
+        result = await _search(
             departure=request.departure,
             arrival=request.arrival,
             departure_date=request.departure_date,
             return_date=request.return_date
         )
         
-        flights = [
-            FlightInfoResponse(
-                flight_number=flight.flight_number,
-                departure_time=flight.departure_time,
-                arrival_time=flight.arrival_time,
-                departure_date=flight.departure_date,
-                price=flight.price,
-                seats_available=flight.seats_available,
-                time_slot=flight.time_slot
-            ) for flight in result.flights
-        ]
+        flights = result.get_response_flights()
         
-        return {
+        body = _render({
             "success": True,
             "flights": flights,
             "total_count": len(flights),
             "search_params": result.search_params
-        }
+        })
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # 只快取沒有錯誤的結果
+        return body, not result.errors
+    
+    return key, compute
+
+def _prune_jobs():
+    """移除已完成且超過保留時間的查詢工作"""
+    jobs = app.state.jobs
+    deadline = time.monotonic() - TigerairConfig.API_JOB_TTL
+    for job_id, (created_at, future) in list(jobs.items()):
+        if created_at >= deadline:
+            break
+        if future.done():
+            del jobs[job_id]
+            app.state.job_errors.pop(job_id, None)
+
+def _job_error(job_id: str, future: asyncio.Future) -> Optional[Tuple[int, dict]]:
+    """
+    取得已完成工作的錯誤回應 (狀態碼, 內容)，成功則回傳None
+    
+    例外只在第一次取得時轉為錯誤回應並保存，之後的查詢直接回傳保存的內容，
+    不會重複拋出同一個例外物件。
+    """
+    errors = app.state.job_errors
+    if job_id not in errors:
+        error = future.exception()
+        if error is None:
+            return None
+        if isinstance(error, HTTPException):
+            errors[job_id] = (error.status_code, {"detail": error.detail})
+        elif isinstance(error, scraper_http.ScrapeError):
+            errors[job_id] = (502, {"detail": str(error)})
+        else:
+            logger.error(f"查詢工作 {job_id} 失敗: {error!r}")
+            errors[job_id] = (500, {"detail": "查詢工作失敗"})
+    return errors[job_id]
+
+def _on_job_done(job_id: str, future: asyncio.Future):
+    """工作完成時立即取出例外並保存錯誤回應，沒有人查詢結果也不會出現未取得例外的警告"""
+    if not future.cancelled():
+        _job_error(job_id, future)
+
+@app.post("/search")
+async def search_flights(request: FlightSearchRequest, http_request: Request,
+                         background_tasks: BackgroundTasks):
+    """搜尋單一航線航班"""
+    key, compute = _single_search(request)
+    entry = await _get_or_compute(key, compute, background_tasks)
+    return _json_response(http_request, *entry)
+
+@app.post("/search/jobs", status_code=202)
+async def create_search_job(request: FlightSearchRequest, background_tasks: BackgroundTasks):
+    """建立單一航線查詢工作，立即回傳job_id，結果以 GET /search/jobs/{job_id} 取得"""
+    _prune_jobs()
+    key, compute = _single_search(request)
+    
+    job_id = uuid.uuid4().hex
+    entry = await _get_cached(key, compute, background_tasks)
+    if entry is not None:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(entry)
+    else:
+        future = asyncio.create_task(_compute_once(key, compute))
+        future.add_done_callback(functools.partial(_on_job_done, job_id))
+    
+    app.state.jobs[job_id] = (time.monotonic(), future)
+    return {"job_id": job_id, "status": "done" if future.done() else "pending"}
+
+@app.get("/search/jobs/{job_id}")
+async def get_search_job(job_id: str, request: Request):
+    """取得查詢工作狀態，完成後回傳與 /search 相同的結果"""
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="查詢工作不存在或已過期")
+    
+    _, future = job
+    if not future.done():
+        return ORJSONResponse({"job_id": job_id, "status": "pending"}, status_code=202)
+    if future.cancelled():
+        raise HTTPException(status_code=500, detail="查詢工作已取消")
+    
+    error = _job_error(job_id, future)
+    if error is not None:
+        status_code, content = error
+        return ORJSONResponse(content, status_code=status_code)
+    return _json_response(request, *future.result())
+
+def _validate_multiple_request(request: MultipleRoutesRequest):
+    """在開始爬取前一次檢查所有航線代碼與日期格式，不合法時回傳422"""
+    unknown_routes = set(request.routes).difference(TigerairConfig.ROUTE_KEYS)
+    if unknown_routes:
+        raise HTTPException(status_code=422, detail=f"未知航線: {', '.join(sorted(unknown_routes))}")
+    
+    invalid_dates = []
+    for date in request.dates:
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            invalid_dates.append(date)
+    if invalid_dates:
+        raise HTTPException(status_code=422, detail=f"日期格式錯誤（應為YYYY-MM-DD）: {', '.join(invalid_dates)}")
 
 @app.post("/search/multiple")
-async def search_multiple_routes(request: MultipleRoutesRequest):
+async def search_multiple_routes(request: MultipleRoutesRequest, http_request: Request,
+                                 background_tasks: BackgroundTasks):
     """搜尋多條航線"""
-    try:
-        scraper = TigerairScraper(headless=True)
-        results = scraper.search_multiple_routes(
-            routes=request.routes,
-            dates=request.dates
-        )
+    _validate_multiple_request(request)
+    key = f"v1:tigerair:multiple:{','.join(request.routes)}:{','.join(request.dates)}"
+    
+    async def compute():
+        results = await _search_routes(request.routes, request.dates)
         
         response_data = {}
         for route, result in results.items():
-            flights = [
-                FlightInfoResponse(
-                    flight_number=flight.flight_number,
-                    departure_time=flight.departure_time,
-                    arrival_time=flight.arrival_time,
-                    departure_date=flight.departure_date,
-                    price=flight.price,
-                    seats_available=flight.seats_available,
-                    time_slot=flight.time_slot
-                ) for flight in result.flights
-            ]
+            flights = result.get_response_flights()
             
             response_data[route] = {
                 "route_name": TigerairConfig.ROUTES[route]["route_name"],
@@ -125,13 +487,24 @@ async def search_multiple_routes(request: MultipleRoutesRequest):
                 "available_count": len(result.get_available_flights())
             }
         
-        return {
+        body = _render({
             "success": True,
             "results": response_data
-        }
+        })
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return body, not any(result.errors for result in results.values())
+    
+    entry = await _get_or_compute(key, compute, background_tasks)
+    return _json_response(http_request, *entry)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # 多worker需以匯入字串指定app；安裝uvloop與httptools後會自動採用
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=TigerairConfig.API_WORKERS,
+        log_level="warning"
+    )
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # 未安裝redis時只能使用程序內快取
+    aioredis = None
+
+class QueryCache:
+    """具有存活時間(TTL)的LRU查詢快取"""
+
+    def __init__(self, default_ttl: int = 300, max_size: int = 1024):
+        """
+        初始化快取
+
+        Args:
+            default_ttl: 預設存活秒數
+            max_size: 最多保留幾筆，超過時淘汰最久未使用的項目
+        """
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """取得快取值，不存在或已過期則回傳None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """寫入快取值"""
+        self._data[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# 只有鎖的值仍是自己的token時才刪除，避免鎖過期後刪到其他worker取得的鎖
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class RedisCache:
+    """
+    以Redis實作、可跨worker共用的快取
+
+    每筆資料另以 `<key>:fresh` 標記新鮮期限；標記過期後資料仍保留 stale_ttl 秒，
+    讓呼叫端先回傳舊值，再於背景更新（stale-while-revalidate）。
+    """
+
+    def __init__(self, url: str, ttl: int = 300, stale_ttl: int = 600, lock_ttl: int = 30):
+        """
+        初始化Redis快取
+
+        Args:
+            url: Redis連線網址
+            ttl: 資料新鮮秒數
+            stale_ttl: 過期後仍可沿用的秒數
+            lock_ttl: 爬取鎖的存活秒數
+        """
+        if aioredis is None:
+            raise RuntimeError("未安裝redis套件: pip install redis")
+
+        self.client = aioredis.from_url(url)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ttl = lock_ttl
+        self._release_lock = self.client.register_script(RELEASE_LOCK_SCRIPT)
+
+    async def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """取得快取值，回傳 (快取值, 是否仍在新鮮期限內)"""
+        value, fresh = await self.client.mget(key, f"{key}:fresh")
+        return value, fresh is not None
+
+    async def set(self, key: str, value: bytes):
+        """寫入快取值並重設新鮮期限"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(key, value, ex=self.ttl + self.stale_ttl)
+            pipe.set(f"{key}:fresh", 1, ex=self.ttl)
+            await pipe.execute()
+
+    async def acquire_lock(self, key: str) -> Optional[str]:
+        """
+        取得爬取鎖，避免多個worker同時爬取相同查詢
+
+        Returns:
+            Optional[str]: 成功時回傳釋放鎖所需的token，鎖已被其他worker持有則回傳None
+        """
+        token = secrets.token_hex(16)
+        if await self.client.set(f"{key}:lock", token, nx=True, ex=self.lock_ttl):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str):
+        """釋放爬取鎖（鎖已過期並被其他worker取得時不動作）"""
+        await self._release_lock(keys=[f"{key}:lock"], args=[token])
+
+    async def wait_for(self, key: str, interval: float = 0.2) -> Optional[bytes]:
+        """等待持有爬取鎖的worker完成，回傳其寫入的值"""
+        while await self.client.exists(f"{key}:lock"):
+            await asyncio.sleep(interval)
+        value, _ = await self.get(key)
+        return value
+
+    async def close(self):
+        """關閉Redis連線"""
+        await self.client.aclose()
+
+class DiskCache:
+    """
+    以SQLite檔案保存的查詢快取，程式重新執行後仍可沿用
+
+    供命令列批次查詢使用，同一組航線與日期在存活時間內不必重新爬取。
+    """
+
+    def __init__(self, path: str, default_ttl: int = 1800):
+        """
+        初始化快取，並清除已過期的項目
+
+        Args:
+            path: SQLite檔案路徑
+            default_ttl: 預設存活秒數
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        """取得快取值，不存在或已過期則回傳None"""
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at, value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return row[1]
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        """寫入快取值"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, time.time() + (ttl or self.default_ttl), value)
+            )
+
+    def close(self):
+        """關閉SQLite連線"""
+        self._conn.close()
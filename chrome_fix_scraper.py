@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import time
+import functools
 import logging
 import os
 import glob
+import queue
+import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from typing import List, Optional, Dict, Tuple, Union
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -14,70 +19,292 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from bs4 import BeautifulSoup, SoupStrainer
+import httpx
 
+import scraper_http
 from config import TigerairConfig
 from models import FlightInfo, FlightSearchResult
+from logging_setup import configure_logging
 
 # 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# 解析航班時使用的正規表示式，於模組載入時編譯一次
+FLIGHT_CARD_CLASS_RE = re.compile(r'flight.*card|card.*flight|itinerary|flight.*item')
+FLIGHT_TEXT_RE = re.compile(r'IT\s*\d+')
+FLIGHT_NUMBER_RE = re.compile(r'(IT\s*\d+|TT\s*\d+)')
+# 起飛/降落時間也符合一般時間格式，一次findall即可依出現順序取得所有時間
+TIME_RE = re.compile(r'(\d{1,2}:\d{2})')
+FLIGHT_CARD_STRAINER = SoupStrainer(['div', 'li'], class_=FLIGHT_CARD_CLASS_RE)
+
+# 文字中是否含航班號碼、時間、價格（不分大小寫，不必先複製一份小寫文字）
+DETAIL_FLIGHT_NUMBER_RE = re.compile(r'it\s*\d+', re.IGNORECASE)
+DETAIL_TIME_RE = re.compile(r'\d{1,2}:\d{2}')
+DETAIL_PRICE_RE = re.compile(r'twd|nt\$|\d{3,5}', re.IGNORECASE)
+
+# 航班卡片中的價格格式，依優先順序比對
+PRICE_RES = [re.compile(pattern) for pattern in (
+    r'TWD\s*([0-9,]+)',
+    r'NT\$\s*([0-9,]+)',
+    r'(\d{1,5}(?:,\d{3})*)\s*(?:元|TWD|$)',
+    r'價格[：:]\s*([0-9,]+)',
+    r'依官方最終核准為準.*?(\d{1,5}(?:,\d{3})*)'  # 特殊情況
+)]
+
+# 價格日曆中的價格格式
+CALENDAR_PRICE_RES = [re.compile(pattern) for pattern in (
+    r'TWD\s*([0-9]{1,5}(?:,\d{3})*)',  # TWD 格式，限制數字長度
+    r'NT\$?\s*([0-9]{1,5}(?:,\d{3})*)',  # NT$ 格式
+    r'\b([1-9]\d{3}(?:,\d{3})*)\b',  # 一般數字格式，必須以非0開頭且至少4位數
+)]
+
+# 以文字辨識的搜尋按鈕，一次查詢取得所有符合的按鈕
+SEARCH_BUTTON_XPATH = (
+    "//button[contains(., '搜尋') or contains(., 'Search') or contains(., '搜索')]"
+    " | //input[@type='submit' and (contains(@value, '搜尋') or contains(@value, 'Search'))]"
+)
+
+# 下拉選單中的機場選項：任一直接文字節點（去除多餘空白後）含代碼或搜尋詞，或代碼屬性相符
+AIRPORT_OPTION_XPATH = (
+    ".//*[text()[contains(normalize-space(.), {code}) or contains(normalize-space(.), {term})]"
+    " or @data-code={code} or @data-iata={code} or @value={code}]"
+)
+
+# 在瀏覽器中依序比對選擇器，依選擇器優先順序回傳符合的元素（arguments[1]為真時只取可見且未停用者）；
+# 一次呼叫即可比對所有選擇器，不必每個選擇器各自等待
+MATCH_ELEMENTS_JS = """
+const [selectors, visibleOnly] = arguments;
+const matched = [];
+for (const selector of selectors) {
+    let elements;
+    try {
+        elements = document.querySelectorAll(selector);
+    } catch (e) {
+        continue;
+    }
+    for (const element of elements) {
+        if (matched.includes(element)) {
+            continue;
+        }
+        if (!visibleOnly || (element.getClientRects().length && !element.disabled)) {
+            matched.push(element);
+        }
+    }
+}
+return matched;
+"""
+
+# 以CDP封鎖的資源：圖片、字型與追蹤/廣告腳本，爬取時用不到
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.webp', '*.gif', '*.svg', '*.ico',
+    '*.woff*', '*.ttf', '*.otf',
+    '*google-analytics*', '*googletagmanager*', '*doubleclick*', '*facebook*', '*hotjar*'
+]
+
+# 搜尋結果頁的航班元素，出現即表示結果已載入；
+# 不使用 [class*='flight'] 等寬鬆條件，搜尋頁本身的元素（例如 .flight-search-btn）也會符合
+RESULT_READY_SELECTOR = ".flight-card, .flight-result, .flight-item, [class*='itinerary']"
+
+# 出發小時（0-23）對應的時間區間
+HOUR_TO_TIME_SLOT = ('早班',) * 6 + ('上午',) * 6 + ('下午',) * 6 + ('晚班',) * 6
+
+# 代表座位已售完的關鍵字
+UNAVAILABLE_RE = re.compile(
+    '|'.join(map(re.escape, ['售完', '已滿', 'sold out', 'unavailable', '無座位', '額滿'])),
+    re.IGNORECASE
+)
+
+def _xpath_literal(value: str) -> str:
+    """將字串轉為XPath字串常值"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat('" + "', \"'\", '".join(value.split("'")) + "')"
+
+@functools.lru_cache(maxsize=1)
+def _resolve_chromedriver_path() -> str:
+    """找到正確的chromedriver路徑，結果在同一程序內共用，避免每次啟動都掃描檔案系統"""
+    # 搜尋可能的chromedriver位置
+    possible_paths = [
+        os.path.expanduser("~/.wdm/drivers/chromedriver/mac64/*/chromedriver-mac-arm64/chromedriver"),
+        os.path.expanduser("~/.wdm/drivers/chromedriver/mac64/*/chromedriver"),
+        "/usr/local/bin/chromedriver",
+        "/opt/homebrew/bin/chromedriver",
+        "/usr/bin/chromedriver"
+    ]
+    
+    for pattern in possible_paths:
+        matches = glob.glob(pattern)
+        for path in matches:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                logger.info(f"找到有效的chromedriver: {path}")
+                return path
+    
+    raise Exception("找不到有效的chromedriver")
+
+@functools.lru_cache(maxsize=2)
+def _chrome_options(headless: bool) -> Options:
+    """建立Chrome選項；參數固定不變，依是否無頭模式各建立一次"""
+    chrome_options = Options()
+    
+    if headless:
+        chrome_options.add_argument('--headless')
+    
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    
+    # 關閉爬取用不到的功能，降低每次啟動的記憶體與CPU用量
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-background-networking')
+    chrome_options.add_argument('--disable-default-apps')
+    chrome_options.add_argument('--disable-sync')
+    chrome_options.add_argument('--disable-translate')
+    chrome_options.add_argument('--mute-audio')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--disable-features=TranslateUI,site-per-process')
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    
+    # DOMContentLoaded後即返回，不等待圖片等資源；之後的元素操作都有顯式等待
+    chrome_options.page_load_strategy = 'eager'
+    
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    
+    return chrome_options
+
 class FixedChromeScraper:
     """修復版Chrome爬蟲"""
     
+    # 機場代碼對應的中文名稱
+    _AIRPORT_NAMES = MappingProxyType({
+        'TPE': ('台北', '桃園', 'TPE', '台北(桃園)'),
+        'NRT': ('東京', '成田', 'NRT', '東京成田'),
+        'OKA': ('沖繩', 'OKA', '那霸', '沖繩(那霸)'),
+        'KIX': ('大阪', '關西', 'KIX'),
+        'NGO': ('名古屋', 'NGO', '中部')
+    })
+    
+    # 可確定是該機場的完整名稱（城市名稱可能對應其他機場，例如台北松山、東京羽田，不列入）
+    _AIRPORT_FULL_NAMES = MappingProxyType({
+        'TPE': ('桃園', '台北(桃園)'),
+        'NRT': ('成田', '東京成田'),
+        'OKA': ('那霸', '沖繩(那霸)'),
+        'KIX': ('關西',),
+        'NGO': ('中部',)
+    })
+    
+    # 出發地、目的地輸入框選擇器（依優先順序）
+    _DEPARTURE_SELECTORS = (
+        "input[placeholder*='出發地']",
+        "input[placeholder*='出發']",
+        "input[name*='departure']",
+        "input[id*='departure']",
+        ".departure-input",
+        "#departure",
+        "[data-testid*='origin']"
+    )
+    _ARRIVAL_SELECTORS = (
+        "input[placeholder*='目的地']",
+        "input[placeholder*='抵達']",
+        "input[name*='arrival']",
+        "input[id*='arrival']",
+        ".arrival-input",
+        "#arrival",
+        "[data-testid*='destination']"
+    )
+    
+    # 機場下拉選單選擇器
+    _DROPDOWN_SELECTORS = (
+        ".dropdown-menu",
+        ".airport-list",
+        ".suggestion-list",
+        "[role='listbox']",
+        ".autocomplete-results",
+        ".airport-options",
+        "ul[class*='dropdown']",
+        "div[class*='dropdown']",
+        ".menu-list"
+    )
+    
+    # 去程、回程日期輸入框選擇器
+    _DEPARTURE_DATE_SELECTORS = (
+        "input[placeholder*='去程']",
+        "input[placeholder*='出發日期']",
+        "input[name*='departure']",
+        "input[name*='outbound']",
+        "#departure-date",
+        "#departureDate",
+        ".departure-date",
+        "input[type='date']"
+    )
+    _RETURN_DATE_SELECTORS = (
+        "input[placeholder*='回程']",
+        "input[placeholder*='回程日期']",
+        "input[name*='return']",
+        "input[name*='inbound']",
+        "#return-date",
+        "#returnDate",
+        ".return-date"
+    )
+    
+    # 搜尋按鈕選擇器（文字比對的按鈕見 SEARCH_BUTTON_XPATH）
+    _SEARCH_BUTTON_SELECTORS = (
+        # 虎航常用的搜尋按鈕樣式
+        "input[value*='搜尋']",
+        "input[value*='Search']",
+        ".search-btn",
+        ".btn-search",
+        "#search-btn",
+        "#searchBtn",
+        "button[type='submit']",
+        "input[type='submit']",
+        ".btn-primary",
+        ".search-button",
+        ".btn-orange",  # 虎航橘色按鈕
+        ".submit-btn",
+        "[data-testid*='search']",
+        "button[class*='search']",
+        "button[class*='submit']",
+        ".flight-search-btn"
+    )
+    
     def __init__(self, headless: bool = True):
         """
         初始化修復版Chrome爬蟲
         
+        可搭配 with 使用，讓多次搜尋共用同一個瀏覽器：
+        
+            with FixedChromeScraper() as scraper:
+                for date in dates:
+                    scraper.search_flights("TPE", "NRT", date)
+        
         Args:
             headless: 是否使用無頭模式運行瀏覽器
         """
         self.config = TigerairConfig()
         self.headless = headless
         self.driver = None
+        self.http_client = None  # 直接HTTP查詢用的連線，第一次使用時建立
+        self._keep_open = False  # 呼叫端以 open()/with 開啟時，搜尋結束後保留瀏覽器直到 close()
     
     def _find_chromedriver_path(self) -> str:
         """找到正確的chromedriver路徑"""
-        # 搜尋可能的chromedriver位置
-        possible_paths = [
-            os.path.expanduser("~/.wdm/drivers/chromedriver/mac64/*/chromedriver-mac-arm64/chromedriver"),
-            os.path.expanduser("~/.wdm/drivers/chromedriver/mac64/*/chromedriver"),
-            "/usr/local/bin/chromedriver",
-            "/opt/homebrew/bin/chromedriver",
-            "/usr/bin/chromedriver"
-        ]
-        
-        for pattern in possible_paths:
-            matches = glob.glob(pattern)
-            for path in matches:
-                if os.path.isfile(path) and os.access(path, os.X_OK):
-                    logger.info(f"找到有效的chromedriver: {path}")
-                    return path
-        
-        raise Exception("找不到有效的chromedriver")
+        return _resolve_chromedriver_path()
     
     def _setup_chrome_driver(self) -> webdriver.Chrome:
         """設定Chrome瀏覽器驅動"""
         try:
             # 設定Chrome選項
-            chrome_options = Options()
-            
-            if self.headless:
-                chrome_options.add_argument('--headless')
-            
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
+            chrome_options = _chrome_options(self.headless)
             
             # 找到正確的chromedriver路徑
             chromedriver_path = self._find_chromedriver_path()
@@ -86,7 +313,15 @@ class FixedChromeScraper:
             # 創建Chrome驅動
             driver = webdriver.Chrome(service=service, options=chrome_options)
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+            # 在瀏覽器網路層直接封鎖用不到的資源，減少每次載入頁面的傳輸量
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                logger.warning(f"無法設定資源封鎖: {str(e)}")
+            # 所有元素查找都使用顯式等待；若再加上隱式等待，
+            # 選擇器逐一嘗試時每個找不到的選擇器都會多等 IMPLICIT_WAIT 秒
+            driver.implicitly_wait(0)
             
             logger.info("✅ Chrome瀏覽器啟動成功")
             return driver
@@ -94,6 +329,27 @@ class FixedChromeScraper:
         except Exception as e:
             raise Exception(f"Chrome啟動失敗: {str(e)}")
     
+    def _wait(self, timeout: float) -> WebDriverWait:
+        """建立以較短間隔輪詢的顯式等待，條件一成立就立即繼續"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.config.SELENIUM_POLL_FREQUENCY)
+    
+    def _find_matching(self, selectors: Tuple[str, ...], timeout: float, visible_only: bool = True) -> list:
+        """等待任一選擇器出現符合的元素，依選擇器順序回傳所有符合的元素，逾時回傳空列表"""
+        try:
+            return self._wait(timeout).until(
+                lambda driver: driver.execute_script(MATCH_ELEMENTS_JS, selectors, visible_only)
+            )
+        except TimeoutException:
+            return []
+        except Exception as e:
+            logger.debug(f"選擇器查詢失敗: {e}")
+            return []
+    
+    def _find_first_visible(self, selectors: Tuple[str, ...], timeout: float):
+        """等待任一選擇器出現可見的元素，依選擇器順序回傳第一個，逾時回傳None"""
+        elements = self._find_matching(selectors, timeout)
+        return elements[0] if elements else None
+    
     def search_flights(self, 
                       departure: str, 
                       arrival: str, 
@@ -119,13 +375,21 @@ class FixedChromeScraper:
             'return_date': return_date
         }
         
+        # 已設定查詢端點時先直接以HTTP查詢，失敗才啟動瀏覽器
+        if scraper_http.is_enabled():
+            try:
+                return scraper_http.search_flights_sync(
+                    self._get_http_client(), departure, arrival, departure_date, return_date
+                )
+            except scraper_http.ScrapeError as e:
+                logger.warning(f"直接HTTP查詢失敗，改用瀏覽器: {str(e)}")
+        
         try:
-            self.driver = self._setup_chrome_driver()
+            self._ensure_driver()
             logger.info(f"開始搜尋航班: {departure} -> {arrival}, 日期: {departure_date}")
             
-            # 訪問虎航網站
+            # 訪問虎航網站（表單填寫時會等待出發地輸入框出現）
             self.driver.get(self.config.BASE_URL)
-            time.sleep(3)
             
             # 填寫搜尋表單
             success = self._fill_search_form(departure, arrival, departure_date, return_date)
@@ -133,8 +397,13 @@ class FixedChromeScraper:
                 result.add_error("填寫搜尋表單失敗")
                 return result
             
-            # 等待搜尋結果載入
-            time.sleep(5)
+            # 等待航班結果載入（同網址更新結果的頁面也適用）
+            try:
+                self._wait(self.config.RESULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_READY_SELECTOR))
+                )
+            except TimeoutException:
+                logger.warning("等待航班結果載入超時，嘗試直接解析")
             
             # 解析航班資料
             flights = self._parse_flight_results()
@@ -147,28 +416,124 @@ class FixedChromeScraper:
             error_msg = f"搜尋航班時發生錯誤: {str(e)}"
             logger.error(error_msg)
             result.add_error(error_msg)
+            # WebDriver本身出錯時瀏覽器可能已損壞，關閉後由下次搜尋重新開啟
+            if isinstance(e, WebDriverException) and not isinstance(e, TimeoutException):
+                self._close_driver()
         
         finally:
-            if self.driver:
-                self.driver.quit()
+            # 未先呼叫 open() 時，只在這次搜尋中使用瀏覽器
+            if not self._keep_open:
+                self.close()
         
         return result
     
+    def open(self) -> 'FixedChromeScraper':
+        """開啟瀏覽器，之後的搜尋都沿用同一個瀏覽器直到呼叫 close()"""
+        self._keep_open = True
+        self._ensure_driver()
+        return self
+    
+    def _ensure_driver(self):
+        """尚未開啟（或已因錯誤關閉）瀏覽器時啟動"""
+        if self.driver is None:
+            self.driver = self._setup_chrome_driver()
+    
+    def _get_http_client(self) -> httpx.Client:
+        """取得直接HTTP查詢用的連線，多次查詢共用以保持連線"""
+        if self.http_client is None:
+            self.http_client = httpx.Client(
+                headers=self.config.HEADERS,
+                timeout=self.config.HTTP_TIMEOUT,
+                follow_redirects=True
+            )
+        return self.http_client
+    
+    def close(self):
+        """關閉瀏覽器與HTTP連線"""
+        self._keep_open = False
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
+        self._close_driver()
+    
+    def _close_driver(self):
+        """只關閉瀏覽器，保留HTTP連線"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.debug(f"關閉瀏覽器失敗: {e}")
+            finally:
+                self.driver = None
+    
+    def __enter__(self) -> 'FixedChromeScraper':
+        return self.open()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @classmethod
+    def scrape_many(cls, pairs: List[Tuple[str, str]], workers: int = 4,
+                    headless: bool = True) -> Dict[Tuple[str, str], FlightSearchResult]:
+        """
+        以多個瀏覽器並行搜尋多組航線與日期
+        
+        Chrome驅動不可跨執行緒共用，每個執行緒各自擁有一個爬蟲與瀏覽器，
+        依序取出尚未搜尋的組合；每次搜尋前隨機延遲，避免查詢過於密集。
+        
+        Args:
+            pairs: (航線代碼, 日期) 列表，航線代碼需為 TigerairConfig.ROUTES 的鍵
+            workers: 同時開啟的瀏覽器數量
+            headless: 是否使用無頭模式運行瀏覽器
+            
+        Returns:
+            Dict[Tuple[str, str], FlightSearchResult]: 以 (航線代碼, 日期) 為鍵的搜尋結果
+        """
+        pending = queue.SimpleQueue()
+        for pair in pairs:
+            pending.put(pair)
+        
+        results = {}
+        
+        def worker():
+            scraper = cls(headless=headless)
+            if not scraper_http.is_enabled():
+                try:
+                    scraper.open()
+                except Exception as e:
+                    # 瀏覽器啟動失敗時，search_flights 會再嘗試並記錄錯誤
+                    logger.warning(f"瀏覽器啟動失敗: {str(e)}")
+            
+            try:
+                while True:
+                    try:
+                        route, date = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    
+                    time.sleep(random.uniform(*TigerairConfig.SCRAPE_JITTER))
+                    route_info = TigerairConfig.ROUTES[route]
+                    results[(route, date)] = scraper.search_flights(
+                        route_info["from"], route_info["to"], date
+                    )
+            finally:
+                scraper.close()
+        
+        worker_count = min(workers, len(pairs))
+        with ThreadPoolExecutor(max_workers=worker_count or 1) as executor:
+            futures = [executor.submit(worker) for _ in range(worker_count)]
+            for future in futures:
+                future.result()
+        
+        return results
+    
     def _fill_search_form(self, departure: str, arrival: str, 
                          departure_date: str, return_date: Optional[str] = None) -> bool:
         """填寫搜尋表單 - 針對虎航動態下拉選單優化"""
         try:
             logger.info(f"填寫搜尋表單: {departure} -> {arrival}, {departure_date}")
             
-            # 等待頁面載入
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # 等待更長時間確保JavaScript加載完成
-            time.sleep(3)
-            
-            # 處理動態出發地選擇
+            # 處理動態出發地選擇（會等待出發地輸入框出現，頁面可操作即開始）
             departure_success = self._select_dynamic_airport(departure, is_departure=True)
             if not departure_success:
                 logger.warning(f"設定出發地失敗: {departure}")
@@ -189,9 +554,6 @@ class FixedChromeScraper:
                 if not return_date_success:
                     logger.warning("設定回程日期失敗")
             
-            # 等待一下讓頁面反應
-            time.sleep(2)
-            
             # 點擊搜尋按鈕
             search_success = self._click_search_button()
             return search_success
@@ -205,53 +567,41 @@ class FixedChromeScraper:
         field_type = "出發地" if is_departure else "目的地"
         logger.info(f"正在設定{field_type}: {airport_code}")
         
-        # 機場代碼對應的中文名稱
-        airport_names = {
-            'TPE': ['台北', '桃園', 'TPE', '台北(桃園)'],
-            'NRT': ['東京', '成田', 'NRT', '東京成田'],
-            'OKA': ['沖繩', 'OKA', '那霸', '沖繩(那霸)'],
-            'KIX': ['大阪', '關西', 'KIX'],
-            'NGO': ['名古屋', 'NGO', '中部']
-        }
+        input_selectors = self._DEPARTURE_SELECTORS if is_departure else self._ARRIVAL_SELECTORS
         
-        # 不同類型的選擇器
-        input_selectors = [
-            "input[placeholder*='出發地']" if is_departure else "input[placeholder*='目的地']",
-            "input[placeholder*='出發']" if is_departure else "input[placeholder*='抵達']", 
-            f"input[name*='{'departure' if is_departure else 'arrival'}']",
-            f"input[id*='{'departure' if is_departure else 'arrival'}']",
-            ".departure-input" if is_departure else ".arrival-input",
-            "#departure" if is_departure else "#arrival",
-            "[data-testid*='origin']" if is_departure else "[data-testid*='destination']"
-        ]
-        
-        for selector in input_selectors:
+        # 所有選擇器共用一次等待，找到的輸入框依選擇器優先順序逐一嘗試
+        for input_element in self._find_matching(input_selectors, 10):
             try:
-                # 找到輸入框
-                input_element = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                )
+                logger.info(f"找到{field_type}輸入框")
                 
-                logger.info(f"找到{field_type}輸入框: {selector}")
+                # 輸入框已是目標機場（例如網站預設值）時不必再選擇
+                if self._has_airport_value(input_element, airport_code):
+                    logger.info(f"{field_type}已是 {airport_code}，略過選擇")
+                    return True
                 
                 # 點擊輸入框激活下拉選單
                 self.driver.execute_script("arguments[0].click();", input_element)
-                time.sleep(1)
                 
                 # 清空並輸入機場代碼或名稱來過濾選項
                 input_element.clear()
-                time.sleep(0.5)
                 
                 # 嘗試輸入不同的搜尋詞
-                search_terms = [airport_code] + airport_names.get(airport_code, [])
+                search_terms = (airport_code,) + self._AIRPORT_NAMES.get(airport_code, ())
                 
                 for term in search_terms:
                     try:
                         input_element.clear()
                         input_element.send_keys(term)
-                        time.sleep(1)
                         
-                        # 嘗試從下拉選單中選擇
+                        # 建議選單顯示後先以鍵盤選取第一個選項，多數下拉元件都支援；
+                        # 選單尚未出現時按ENTER可能直接送出表單，因此必須先等待
+                        if self._find_matching(self._DROPDOWN_SELECTORS, 3):
+                            input_element.send_keys(Keys.ARROW_DOWN, Keys.ENTER)
+                            if self._has_airport_value(input_element, airport_code, typed=term):
+                                logger.info(f"{field_type}設定成功: {airport_code} (鍵盤選取，搜尋詞: {term})")
+                                return True
+                        
+                        # 嘗試從下拉選單中選擇（會等待下拉選單出現）
                         if self._select_from_dropdown(airport_code, term):
                             logger.info(f"{field_type}設定成功: {airport_code} (搜尋詞: {term})")
                             return True
@@ -261,81 +611,63 @@ class FixedChromeScraper:
                         continue
                 
             except Exception as e:
-                logger.debug(f"{field_type}選擇器 {selector} 失敗: {e}")
+                logger.debug(f"{field_type}輸入框操作失敗: {e}")
                 continue
         
         logger.warning(f"{field_type}設定失敗: {airport_code}")
         return False
 
+    def _has_airport_value(self, input_element, airport_code: str, typed: Optional[str] = None) -> bool:
+        """
+        輸入框的值是否已是指定機場（與剛輸入的搜尋詞完全相同則不算已選取）
+        
+        值中須含有獨立的機場代碼（例如 "台北(桃園) TPE"），或完全等於該機場的完整名稱；
+        只含城市名稱（例如 "台北(松山)"、"東京羽田"）不算符合。
+        """
+        value = (input_element.get_attribute('value') or '').strip()
+        if not value or value == typed:
+            return False
+        if re.search(rf'(?<![A-Za-z]){re.escape(airport_code)}(?![A-Za-z])', value):
+            return True
+        return value in self._AIRPORT_FULL_NAMES.get(airport_code, ())
+    
     def _select_from_dropdown(self, airport_code: str, search_term: str) -> bool:
         """從下拉選單中選擇機場"""
-        # 等待下拉選單出現
-        dropdown_selectors = [
-            ".dropdown-menu",
-            ".airport-list", 
-            ".suggestion-list",
-            "[role='listbox']",
-            ".autocomplete-results",
-            ".airport-options",
-            "ul[class*='dropdown']",
-            "div[class*='dropdown']",
-            ".menu-list"
-        ]
-        
-        for dropdown_selector in dropdown_selectors:
+        # 等待任一下拉選單出現（只要求存在於DOM中）
+        for dropdown in self._find_matching(self._DROPDOWN_SELECTORS, 3, visible_only=False):
             try:
-                # 等待下拉選單出現
-                dropdown = WebDriverWait(self.driver, 3).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, dropdown_selector))
-                )
-                
-                # 尋找匹配的選項
-                option_selectors = [
-                    f"*[text()*='{airport_code}']",
-                    f"*[contains(text(), '{airport_code}')]",
-                    f"*[contains(text(), '{search_term}')]",
-                    f"li:contains('{airport_code}')",
-                    f"div:contains('{airport_code}')",
-                    f"[data-code='{airport_code}']",
-                    f"[data-iata='{airport_code}']",
-                    f"[value='{airport_code}']"
-                ]
-                
-                # 直接在下拉選單中尋找選項
-                options = dropdown.find_elements(By.XPATH, f".//*[contains(text(), '{airport_code}') or contains(text(), '{search_term}')]")
+                # 在下拉選單中尋找文字或機場代碼屬性符合的選項
+                options = dropdown.find_elements(By.XPATH, AIRPORT_OPTION_XPATH.format(
+                    code=_xpath_literal(airport_code), term=_xpath_literal(search_term)
+                ))
                 
                 if options:
                     for option in options:
                         try:
                             self.driver.execute_script("arguments[0].click();", option)
                             logger.info(f"成功選擇機場選項: {option.text[:50]}")
-                            time.sleep(1)
+                            self._wait_until_closed(dropdown)
                             return True
                         except:
                             continue
                 
             except Exception as e:
-                logger.debug(f"下拉選單選擇器 {dropdown_selector} 失敗: {e}")
+                logger.debug(f"下拉選單操作失敗: {e}")
                 continue
         
         return False
 
+    def _wait_until_closed(self, dropdown) -> None:
+        """等待下拉選單在選取後關閉，未關閉也不影響後續步驟"""
+        try:
+            self._wait(1).until(EC.invisibility_of_element(dropdown))
+        except TimeoutException:
+            pass
+
     def _set_dynamic_date(self, departure_date: str) -> bool:
         """設定動態日期選擇器"""
         logger.info(f"正在設定出發日期: {departure_date}")
         
-        # 日期輸入框選擇器
-        date_selectors = [
-            "input[placeholder*='去程']",
-            "input[placeholder*='出發日期']",
-            "input[name*='departure']",
-            "input[name*='outbound']",
-            "#departure-date",
-            "#departureDate",
-            ".departure-date",
-            "input[type='date']"
-        ]
-        
         # 解析日期
         try:
             from datetime import datetime
@@ -353,30 +685,21 @@ class FixedChromeScraper:
         except:
             date_formats = [departure_date]
         
-        for selector in date_selectors:
+        for date_element in self._find_matching(self._DEPARTURE_DATE_SELECTORS, 10):
             try:
-                # 找到日期輸入框
-                date_element = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                )
-                
-                logger.info(f"找到日期輸入框: {selector}")
+                logger.info("找到日期輸入框")
                 
                 # 點擊激活日期選擇器
                 self.driver.execute_script("arguments[0].click();", date_element)
-                time.sleep(1)
                 
                 # 嘗試不同的日期格式
                 for date_format in date_formats:
                     try:
                         date_element.clear()
-                        time.sleep(0.5)
                         date_element.send_keys(date_format)
-                        time.sleep(1)
                         
                         # 按下Tab確認
                         date_element.send_keys(Keys.TAB)
-                        time.sleep(1)
                         
                         logger.info(f"日期設定成功: {date_format}")
                         return True
@@ -386,7 +709,7 @@ class FixedChromeScraper:
                         continue
                 
             except Exception as e:
-                logger.debug(f"日期選擇器 {selector} 失敗: {e}")
+                logger.debug(f"日期輸入框操作失敗: {e}")
                 continue
         
         logger.warning(f"日期設定失敗: {departure_date}")
@@ -396,35 +719,18 @@ class FixedChromeScraper:
         """設定回程日期"""
         logger.info(f"正在設定回程日期: {return_date}")
         
-        # 回程日期輸入框選擇器
-        return_date_selectors = [
-            "input[placeholder*='回程']",
-            "input[placeholder*='回程日期']", 
-            "input[name*='return']",
-            "input[name*='inbound']",
-            "#return-date",
-            "#returnDate",
-            ".return-date"
-        ]
-        
         # 使用類似的邏輯設定回程日期
-        return self._set_date_with_selectors(return_date, return_date_selectors)
+        return self._set_date_with_selectors(return_date, self._RETURN_DATE_SELECTORS)
     
-    def _set_date_with_selectors(self, date_str: str, selectors: list) -> bool:
+    def _set_date_with_selectors(self, date_str: str, selectors: Tuple[str, ...]) -> bool:
         """用指定的選擇器設定日期"""
-        for selector in selectors:
+        for date_element in self._find_matching(selectors, 10):
             try:
-                date_element = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                )
-                
                 self.driver.execute_script("arguments[0].click();", date_element)
-                time.sleep(1)
                 
                 date_element.clear()
                 date_element.send_keys(date_str)
                 date_element.send_keys(Keys.TAB)
-                time.sleep(1)
                 
                 return True
                 
@@ -437,57 +743,22 @@ class FixedChromeScraper:
         """點擊搜尋按鈕 - 針對虎航網站優化"""
         logger.info("正在尋找並點擊搜尋按鈕...")
         
-        search_selectors = [
-            # 虎航常用的搜尋按鈕樣式
-            "button:contains('搜尋')",
-            "button:contains('Search')", 
-            "button:contains('搜索')",
-            "input[value*='搜尋']",
-            "input[value*='Search']",
-            ".search-btn",
-            ".btn-search",
-            "#search-btn",
-            "#searchBtn",
-            "button[type='submit']",
-            "input[type='submit']",
-            ".btn-primary",
-            ".search-button",
-            ".btn-orange",  # 虎航橘色按鈕
-            ".submit-btn",
-            "[data-testid*='search']",
-            "button[class*='search']",
-            "button[class*='submit']",
-            ".flight-search-btn"
-        ]
-        
-        for selector in search_selectors:
-            try:
-                # 特殊處理contains選擇器
-                if ':contains(' in selector:
-                    text = selector.split("'")[1]
-                    buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                    for button in buttons:
-                        if text in button.text:
-                            # 確認按鈕可見且可點擊
-                            if button.is_displayed() and button.is_enabled():
-                                self.driver.execute_script("arguments[0].click();", button)
-                                logger.info(f"點擊搜尋按鈕成功: {text}")
-                                time.sleep(2)  # 等待搜尋開始
-                                return True
-                else:
-                    search_btn = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    
-                    if search_btn.is_displayed() and search_btn.is_enabled():
-                        self.driver.execute_script("arguments[0].click();", search_btn)
-                        logger.info(f"點擊搜尋按鈕成功: {selector}")
-                        time.sleep(2)  # 等待搜尋開始
-                        return True
-                        
-            except Exception as e:
-                logger.debug(f"搜尋按鈕選擇器 {selector} 失敗: {e}")
-                continue
+        # 優先使用文字為「搜尋」的按鈕
+        try:
+            for button in self.driver.find_elements(By.XPATH, SEARCH_BUTTON_XPATH):
+                if button.is_displayed() and button.is_enabled():
+                    self.driver.execute_script("arguments[0].click();", button)
+                    logger.info(f"點擊搜尋按鈕成功: {button.text or button.get_attribute('value')}")
+                    return True
+        except Exception as e:
+            logger.debug(f"以文字尋找搜尋按鈕失敗: {e}")
+        
+        # 所有選擇器共用一次等待，每次輪詢只需一次往返
+        search_btn = self._find_first_visible(self._SEARCH_BUTTON_SELECTORS, 3)
+        if search_btn is not None:
+            self.driver.execute_script("arguments[0].click();", search_btn)
+            logger.info("點擊搜尋按鈕成功")
+            return True
         
         # 如果找不到按鈕，嘗試按Enter鍵觸發搜尋
         try:
@@ -495,7 +766,6 @@ class FixedChromeScraper:
             body = self.driver.find_element(By.TAG_NAME, "body")
             body.send_keys(Keys.ENTER)
             logger.info("使用Enter鍵觸發搜尋")
-            time.sleep(2)
             return True
         except:
             pass
@@ -504,47 +774,37 @@ class FixedChromeScraper:
         return False
     
     def _parse_flight_results(self) -> List[FlightInfo]:
-        """解析航班搜尋結果"""
+        """解析目前頁面的航班搜尋結果（呼叫端已等待結果載入）"""
         flights = []
         
         try:
-            # 等待結果載入
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".flight-card, .flight-result, .flight-item, .price, [class*='flight'], [class*='itinerary']"))
-            )
-            
-            # 取得頁面源碼並用BeautifulSoup解析
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # 先嘗試解析具體的航班卡片
-            flights = self._parse_flight_cards(soup)
-            
-            # 如果沒找到航班卡片，嘗試解析航班列表
-            if not flights:
-                flights = self._parse_flight_list(soup)
-            
-            # 如果還是沒找到，嘗試解析價格日曆作為備選
-            if not flights:
-                flights = self._parse_price_calendar(soup)
-            
-        except TimeoutException:
-            logger.warning("等待航班結果載入超時，嘗試直接解析")
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            flights = self._parse_flight_cards(soup) or self._parse_flight_list(soup) or self._parse_price_calendar(soup)
+            flights = self._parse_page_source(self.driver.page_source)
         
         except Exception as e:
             logger.error(f"解析航班結果失敗: {str(e)}")
         
         return flights
     
+    def _parse_page_source(self, page_source: str) -> List[FlightInfo]:
+        """依序嘗試航班卡片、航班列表、價格日曆三種解析方式"""
+        with FlightInfo.batch_timestamp():
+            # 先只解析航班卡片的子樹，找到卡片時不必建立整頁的樹
+            card_soup = BeautifulSoup(page_source, 'lxml', parse_only=FLIGHT_CARD_STRAINER)
+            flights = self._parse_flight_cards(card_soup)
+            if flights:
+                return flights
+            
+            # 沒找到航班卡片時才解析整頁，嘗試航班列表，再以價格日曆作為備選
+            soup = BeautifulSoup(page_source, 'lxml')
+            return self._parse_flight_list(soup) or self._parse_price_calendar(soup)
+    
     def _parse_flight_cards(self, soup) -> List[FlightInfo]:
         """解析航班卡片（最詳細的資訊）"""
         flights = []
         
         try:
             # 尋找航班卡片容器
-            flight_cards = soup.find_all(['div', 'li'], class_=re.compile(r'flight.*card|card.*flight|itinerary|flight.*item'))
+            flight_cards = soup.find_all(['div', 'li'], class_=FLIGHT_CARD_CLASS_RE)
             
             for card in flight_cards:
                 flight_info = self._extract_detailed_flight_info(card)
@@ -564,100 +824,103 @@ class FixedChromeScraper:
         
         try:
             # 尋找包含航班資訊的元素
-            flight_elements = soup.find_all(text=re.compile(r'IT\s*\d+'))
+            flight_elements = soup.find_all(text=FLIGHT_TEXT_RE)
+            
+            # 多個航班號碼常共用相同的祖先元素，記錄每個祖先的檢查結果，
+            # 每個元素只呼叫一次 get_text()：包含完整航班資訊時存文字，否則存空字串
+            checked = {}
+            parsed = set()
             
             for element in flight_elements:
-                parent = element.parent
-                while parent and parent.name != 'body':
+                for parent in element.parents:
+                    if parent.name == 'body':
+                        break
+                    
                     # 檢查父元素是否包含完整的航班資訊
-                    if self._contains_flight_details(parent):
-                        flight_info = self._extract_detailed_flight_info(parent)
-                        if flight_info and flight_info.flight_number:
-                            flights.append(flight_info)
+                    key = id(parent)
+                    text = checked.get(key)
+                    if text is None:
+                        text = parent.get_text()
+                        if not self._contains_flight_details(text):
+                            text = ""
+                        checked[key] = text
+                    
+                    if text:
+                        if key not in parsed:
+                            parsed.add(key)
+                            flight_info = self._extract_detailed_flight_info(parent, text)
+                            if flight_info and flight_info.flight_number:
+                                flights.append(flight_info)
                         break
-                    parent = parent.parent
             
-            # 去除重複
-            unique_flights = []
-            seen_flights = set()
+            # 去除重複（以航班號碼、出發時間、價格為鍵，保留第一筆）
+            unique_flights = {}
             for flight in flights:
-                flight_key = f"{flight.flight_number}-{flight.departure_time}-{flight.price}"
-                if flight_key not in seen_flights:
-                    unique_flights.append(flight)
-                    seen_flights.add(flight_key)
+                unique_flights.setdefault((flight.flight_number, flight.departure_time, flight.price), flight)
             
             logger.info(f"從航班列表解析出 {len(unique_flights)} 筆航班")
-            return unique_flights
+            return list(unique_flights.values())
             
         except Exception as e:
             logger.error(f"解析航班列表失敗: {str(e)}")
         
         return []
     
-    def _contains_flight_details(self, element) -> bool:
-        """檢查元素是否包含航班詳細資訊"""
-        text = element.get_text().lower()
-        has_flight_number = bool(re.search(r'it\s*\d+', text))
-        has_time = bool(re.search(r'\d{1,2}:\d{2}', text))
-        has_price = bool(re.search(r'twd|nt\$|\d{3,5}', text))
+    def _contains_flight_details(self, text: str) -> bool:
+        """檢查元素文字是否包含航班詳細資訊"""
+        has_flight_number = bool(DETAIL_FLIGHT_NUMBER_RE.search(text))
+        has_time = bool(DETAIL_TIME_RE.search(text))
+        has_price = bool(DETAIL_PRICE_RE.search(text))
         
         return has_flight_number and (has_time or has_price)
     
-    def _extract_detailed_flight_info(self, element) -> Optional[FlightInfo]:
-        """從HTML元素中提取詳細航班資訊"""
+    def _to_price(self, price_str: Optional[str]) -> Optional[float]:
+        """將價格字串轉為數值，不在合理範圍內則回傳None"""
+        if not price_str:
+            return None
+        try:
+            price = float(price_str.replace(',', ''))
+        except ValueError:
+            return None
+        # 確保價格在合理範圍內
+        return price if 1000 <= price <= 50000 else None
+    
+    def _extract_detailed_flight_info(self, element, text: Optional[str] = None) -> Optional[FlightInfo]:
+        """
+        從HTML元素中提取詳細航班資訊
+        
+        Args:
+            element: 航班所在的HTML元素
+            text: 已取得的元素文字，避免重複呼叫 get_text()
+        """
         try:
-            text = element.get_text()
+            if text is None:
+                text = element.get_text()
             
             # 提取航班號碼
-            flight_number_match = re.search(r'(IT\s*\d+|TT\s*\d+)', text)
+            flight_number_match = FLIGHT_NUMBER_RE.search(text)
             if not flight_number_match:
                 return None
             
             flight_number = flight_number_match.group(1).replace(' ', '')
             
-            # 提取時間資訊 - 更精確的時間匹配
-            time_patterns = [
-                r'(\d{1,2}:\d{2})',  # 基本時間格式
-                r'起飛[：:]?\s*(\d{1,2}:\d{2})',  # 起飛時間
-                r'降落[：:]?\s*(\d{1,2}:\d{2})',  # 降落時間
-            ]
-            
-            all_times = []
-            for pattern in time_patterns:
-                times = re.findall(pattern, text)
-                all_times.extend(times)
+            # 提取時間資訊
+            all_times = TIME_RE.findall(text)
             
             # 去除重複並排序
             unique_times = list(dict.fromkeys(all_times))  # 保持順序去重
             
-            # 提取價格資訊 - 更精確的價格匹配
-            price_patterns = [
-                r'TWD\s*([0-9,]+)',
-                r'NT\$\s*([0-9,]+)', 
-                r'(\d{1,5}(?:,\d{3})*)\s*(?:元|TWD|$)',
-                r'價格[：:]\s*([0-9,]+)',
-                r'依官方最終核准為準.*?(\d{1,5}(?:,\d{3})*)'  # 特殊情況
-            ]
-            
+            # 提取價格資訊，依優先順序取第一個合理價格
             price = None
-            for pattern in price_patterns:
-                price_match = re.search(pattern, text)
+            for price_re in PRICE_RES:
+                price_match = price_re.search(text)
                 if price_match:
-                    price_str = price_match.group(1)
-                    try:
-                        potential_price = float(price_str.replace(',', ''))
-                        # 確保價格在合理範圍內
-                        if 1000 <= potential_price <= 50000:
-                            price = potential_price
-                            break
-                    except:
-                        continue
+                    price = self._to_price(price_match.group(1))
+                    if price is not None:
+                        break
             
             # 檢查座位狀況
-            seats_available = True
-            unavailable_keywords = ['售完', '已滿', 'sold out', 'unavailable', '無座位', '額滿']
-            if any(keyword in text.lower() for keyword in unavailable_keywords):
-                seats_available = False
+            seats_available = not UNAVAILABLE_RE.search(text)
             
             # 生成更具體的來源網址
             source_url = self.driver.current_url
@@ -693,18 +956,12 @@ class FixedChromeScraper:
         flights = []
         
         try:
-            # 尋找價格元素 - 更精確的價格匹配
-            price_patterns = [
-                r'TWD\s*([0-9]{1,5}(?:,\d{3})*)',  # TWD 格式，限制數字長度
-                r'NT\$?\s*([0-9]{1,5}(?:,\d{3})*)',  # NT$ 格式
-                r'\b([1-9]\d{3}(?:,\d{3})*)\b',  # 一般數字格式，必須以非0開頭且至少4位數
-            ]
-            
+            # 尋找價格元素
             text = soup.get_text()
             all_prices = []
             
-            for pattern in price_patterns:
-                matches = re.findall(pattern, text)
+            for price_re in CALENDAR_PRICE_RES:
+                matches = price_re.findall(text)
                 for match in matches:
                     try:
                         price = float(match.replace(',', ''))
@@ -738,14 +995,7 @@ class FixedChromeScraper:
     def _get_time_slot(self, time_str: str) -> str:
         """判斷時間屬於哪個時段"""
         try:
-            hour = int(time_str.split(':')[0])
-            if 6 <= hour < 12:
-                return "上午"
-            elif 12 <= hour < 18:
-                return "下午"
-            elif 18 <= hour < 24:
-                return "晚班"
-            else:
-                return "早班"
-        except:
-            return "未知" 
\ No newline at end of file
+            hour = int(time_str.partition(':')[0])
+        except ValueError:
+            return "未知"
+        return HOUR_TO_TIME_SLOT[hour] if 0 <= hour < 24 else "早班"
@@ -1,5 +1,6 @@
 import os
 from datetime import datetime, timedelta
+from types import MappingProxyType
 
 class TigerairConfig:
     """虎航爬蟲配置類別"""
@@ -8,8 +9,11 @@ class TigerairConfig:
     BASE_URL = "https://www.tigerairtw.com"
     SEARCH_URL = "https://www.tigerairtw.com/zh-tw/book/select-flight"
     
+    # 航班查詢JSON端點（以瀏覽器開發者工具擷取，留空則只使用瀏覽器爬取）
+    API_SEARCH_URL = os.getenv("TIGERAIR_API_SEARCH_URL", "")
+    
     # 台灣到日本的主要航線
-    ROUTES = {
+    ROUTES = MappingProxyType({
         "TPE_NRT": {"from": "TPE", "to": "NRT", "route_name": "台北-東京成田"},
         "TPE_KIX": {"from": "TPE", "to": "KIX", "route_name": "台北-大阪關西"},
         "TPE_FUK": {"from": "TPE", "to": "FUK", "route_name": "台北-福岡"},
@@ -17,7 +21,8 @@ class TigerairConfig:
         "KHH_NRT": {"from": "KHH", "to": "NRT", "route_name": "高雄-東京成田"},
         "KHH_KIX": {"from": "KHH", "to": "KIX", "route_name": "高雄-大阪關西"},
         "TSA": {"from": "TSA", "to": "NRT", "route_name": "台北松山-東京成田"}
-    }
+    })
+    ROUTE_KEYS = frozenset(ROUTES)  # 用於驗證航線代碼
     
     # 請求頭設定
     HEADERS = {
@@ -32,25 +37,58 @@ class TigerairConfig:
     # Selenium配置
     SELENIUM_TIMEOUT = 10
     IMPLICIT_WAIT = 5
+    RESULT_TIMEOUT = 15  # 送出搜尋後等待航班結果載入的秒數
+    SELENIUM_POLL_FREQUENCY = 0.1  # 顯式等待的輪詢間隔秒數
+    SELENIUM_POOL_SIZE = min(32, (os.cpu_count() or 1) * 4)  # WebDriver指令連線池大小
+    SCRAPE_JITTER = (1, 3)  # 並行爬取時每次查詢前的隨機延遲秒數範圍
+    BROWSER_POOL_SIZE = 2  # 批次查詢時最多同時開啟的瀏覽器數量
+    DRIVER_MAX_USES = 50  # 同一個瀏覽器查詢幾次後重新啟動，避免記憶體持續增加
     
     # 重試設定
     MAX_RETRIES = 3
     RETRY_DELAY = 2
     
+    # API設定
+    API_THREADPOOL_SIZE = 64  # 執行阻塞爬蟲呼叫的執行緒數上限
+    API_SCRAPER_POOL_SIZE = 4  # 常駐的爬蟲（瀏覽器）數量
+    HTTP_TIMEOUT = 10  # 直接HTTP查詢逾時秒數
+    HTTP_CONCURRENCY = 8  # 批次直接HTTP查詢時同時進行的請求數上限
+    HTTP_MAX_CONNECTIONS = 100  # 共用HTTP連線池上限
+    API_JOB_TTL = 600  # 非同步查詢工作完成後保留秒數
+    API_CORS_ORIGINS = [o.strip() for o in os.getenv("API_CORS_ORIGINS", "*").split(",") if o.strip()]  # 允許跨域的來源，以逗號分隔
+    # uvicorn worker數。每個worker各自擁有 API_SCRAPER_POOL_SIZE 個常駐的無頭Chrome，
+    # 每個約佔200-300MB記憶體，預設2個worker即約8個瀏覽器（約2GB）；
+    # 不依CPU核心數自動放大，增加worker前請先確認記憶體是否足夠
+    API_WORKERS = int(os.getenv("WEB_CONCURRENCY", 2))
+    
+    # 快取設定
+    CACHE_TTL = 300  # 查詢結果快取秒數（座位與票價變動頻繁）
+    CACHE_MAX_SIZE = 1024
+    CACHE_STALE_TTL = 600  # 過期後仍可先回傳舊值的秒數
+    REDIS_URL = os.getenv("REDIS_URL", "")  # 設定後啟用跨worker共用的Redis快取
+    # 爬取鎖秒數：涵蓋一次查詢最長的等待時間（直接HTTP查詢、等待表單、選擇單程/來回、
+    # 各欄位與搜尋按鈕、等待結果），另加60秒供啟動瀏覽器與載入頁面
+    REDIS_LOCK_TTL = HTTP_TIMEOUT + SELENIUM_TIMEOUT * 2 + IMPLICIT_WAIT * 5 + RESULT_TIMEOUT + 60
+    
     # 資料儲存設定
     OUTPUT_DIR = "flight_data"
+    SEARCH_CACHE_FILE = os.path.join(OUTPUT_DIR, ".search_cache.sqlite3")  # 命令列查詢結果的磁碟快取
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 1800))  # 磁碟快取秒數，設為0停用
     CSV_FILENAME = "tigerair_flights_{date}.csv"
     JSON_FILENAME = "tigerair_flights_{date}.json"
+    JSON_PRETTY = bool(os.getenv("DEBUG"))  # 設定環境變數DEBUG時JSON輸出縮排2格，否則輸出精簡格式
     
     @staticmethod
-    def get_default_search_dates():
-        """取得預設搜尋日期範圍（未來30天）"""
+    def iter_default_search_dates(days: int = 30):
+        """逐一產生預設搜尋日期（未來days天，YYYY-MM-DD）"""
         today = datetime.now().date()
-        dates = []
-        for i in range(1, 31):  # 未來30天
-            search_date = today + timedelta(days=i)
-            dates.append(search_date.strftime("%Y-%m-%d"))
-        return dates
+        for i in range(1, days + 1):
+            yield (today + timedelta(days=i)).isoformat()
+    
+    @staticmethod
+    def get_default_search_dates(days: int = 30):
+        """取得預設搜尋日期範圍（未來30天）"""
+        return list(TigerairConfig.iter_default_search_dates(days))
     
     @staticmethod
     def get_time_slots():
@@ -10,7 +10,17 @@
 from datetime import datetime, timedelta
 from config import TigerairConfig
 from models import FlightInfo, FlightSearchResult
-import random
+import numpy as np
+
+# 模擬資料用的亂數產生器
+_rng = np.random.default_rng()
+
+# 模擬航班的起飛、抵達時間，依航班順序輪流使用
+MOCK_DEPARTURE_TIMES = np.array(["07:30", "13:45", "18:20"], dtype=object)
+MOCK_ARRIVAL_TIMES = np.array(["11:45", "17:55", "22:35"], dtype=object)
+
+# 出發小時（0-23）對應的時間區間
+HOUR_TO_TIME_SLOT = ("早班",) * 6 + ("上午",) * 6 + ("下午",) * 6 + ("晚班",) * 6
 
 def generate_mock_flights(route_code: str, date: str, flight_count: int = 3) -> list:
     """生成模擬航班資料"""
@@ -29,40 +39,34 @@ def generate_mock_flights(route_code: str, date: str, flight_count: int = 3) ->
     
     base_price = base_prices.get(route_code, 8000)
     
+    # 一次產生所有航班的價格（低於平均價格，7-9.5折）與時間
+    discount_rates = _rng.uniform(0.7, 0.95, size=flight_count)
+    prices = (base_price * discount_rates).astype(np.int32).tolist()
+    slots = np.arange(flight_count) % len(MOCK_DEPARTURE_TIMES)
+    departure_times = MOCK_DEPARTURE_TIMES[slots].tolist()
+    arrival_times = MOCK_ARRIVAL_TIMES[slots].tolist()
+    
     for i in range(flight_count):
-        # 生成低於平均價格的航班
-        discount_rate = random.uniform(0.7, 0.95)  # 7-9.5折
-        price = int(base_price * discount_rate)
-        
         flight_number = f"IT{300 + i*2:02d}"
-        departure_times = ["07:30", "13:45", "18:20"]
-        arrival_times = ["11:45", "17:55", "22:35"]
         
         flight = FlightInfo(
             flight_number=flight_number,
             departure_airport=route_info["from"],
             departure_city=route_info["from"],
-            departure_time=departure_times[i % 3],
+            departure_time=departure_times[i],
             departure_date=date,
             arrival_airport=route_info["to"],
             arrival_city=route_info["to"],
-            arrival_time=arrival_times[i % 3],
-            price=price,
+            arrival_time=arrival_times[i],
+            price=prices[i],
             seats_available=True,
             currency="TWD"
         )
         
-        # 設定時間區間
-        hour = int(flight.departure_time.split(':')[0])
-        if hour < 6:
-            flight.time_slot = "早班"
-        elif hour < 12:
-            flight.time_slot = "上午"
-        elif hour < 18:
-            flight.time_slot = "下午"
-        else:
-            flight.time_slot = "晚班"
-            
+        # 設定時間區間（模擬時間皆為兩位數小時）
+        flight.time_slot = HOUR_TO_TIME_SLOT[int(flight.departure_time[:2])]
+        
+
         flights.append(flight)
     
     return flights
@@ -192,26 +196,25 @@ def example_find_cheapest():
     print("範例4: 尋找最便宜的航班")
     print("="*50)
     
-    # 生成一週的低價航班資料
+    # 生成一週的低價航班資料，票價另存於平行的陣列供排序
     cheapest_flights = []
     base_price = 8500
+    prices = (base_price * _rng.uniform(0.65, 0.85, size=7)).astype(np.int64)  # 6.5-8.5折
     
-    for i in range(1, 8):
+    for i, price in enumerate(prices.tolist(), 1):
         date = (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
-        price = base_price * random.uniform(0.65, 0.85)  # 6.5-8.5折
         
         flight = FlightInfo(
             flight_number=f"IT{301 + i*2}",
             departure_time=f"{7 + i}:30",
             arrival_time=f"{11 + i}:45",
             departure_date=date,
-            price=int(price)
+            price=price
         )
         cheapest_flights.append(flight)
     
-    # 排序找出最便宜的5個
-    cheapest_flights.sort(key=lambda x: x.price)
-    top_5 = cheapest_flights[:5]
+    # 以票價陣列排序找出最便宜的5個（同價時保持日期順序）
+    top_5 = [cheapest_flights[i] for i in np.argsort(prices, kind='stable')[:5]]
     
     search_url = get_search_url("TPE", "NRT", top_5[0].departure_date)
     print(f"🔗 搜尋連結: {search_url}")
@@ -1,28 +1,45 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import csv
+import heapq
 import logging
-from datetime import datetime, timedelta
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Tuple, Optional
-import pandas as pd
 import json
 
-from tigerair_scraper import TigerairScraper
-from safari_scraper import SafariTigerairScraper
-from chrome_fix_scraper import FixedChromeScraper
+try:
+    import orjson
+except ImportError:  # 未安裝orjson時改用標準函式庫json
+    orjson = None
+
 from config import TigerairConfig
 from models import FlightInfo, FlightSearchResult
+from logging_setup import configure_logging
 
 # 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# 寫入結果檔案時的緩衝區大小
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# 儲存CSV時的欄位順序
+CSV_FIELDNAMES = [
+    '排名', '航線', '出發日期', '回程日期', '總價格', '平均每日費用',
+    '去程航班', '去程時間', '去程價格', '回程航班', '回程時間', '回程價格'
+]
+
 class JapanCheapestFlightFinder:
     """日本最便宜機票查詢器"""
     
+    # 單程查詢結果快取上限
+    LEG_CACHE_SIZE = 512
+    
     def __init__(self, headless: bool = True, prefer_safari: bool = False):
         """
         初始化查詢器
@@ -34,15 +51,23 @@ class JapanCheapestFlightFinder:
         # 嘗試使用修復版Chrome，如果失敗則回退到Safari
         import platform
         
+        # 瀏覽器爬蟲模組載入較慢，只在建立查詢器時才匯入實際使用的那一個
         try:
             # 先嘗試使用修復版Chrome
+            from chrome_fix_scraper import FixedChromeScraper
             self.scraper = FixedChromeScraper(headless=headless)
+            self.scraper_class = FixedChromeScraper
+            # 修復版Chrome可讓同一執行緒的查詢共用瀏覽器，也能同時開啟多個瀏覽器
+            self.reuses_browser = True
             logger.info("🚀 使用修復版Chrome瀏覽器")
         except Exception as chrome_error:
             if platform.system() == 'Darwin':
                 # 在Mac上回退到Safari
                 try:
+                    from safari_scraper import SafariTigerairScraper
                     self.scraper = SafariTigerairScraper(headless=headless)
+                    self.scraper_class = SafariTigerairScraper
+                    self.reuses_browser = False
                     logger.info("🍎 Chrome不可用，回退到Safari瀏覽器")
                 except Exception as safari_error:
                     error_msg = f"""
@@ -69,8 +94,86 @@ class JapanCheapestFlightFinder:
         
         # 五天四夜行程天數
         self.trip_duration = 5
+        
+        # 並行搜尋時每個執行緒各自擁有一個爬蟲（瀏覽器驅動不可跨執行緒共用）
+        self.headless = headless
+        self._local = threading.local()
+        self._thread_scrapers = []
+        self._thread_scrapers_lock = threading.Lock()
+        
+        # 單程查詢結果，以 (出發地, 目的地, 日期) 為鍵；值為Future，讓同時查詢相同航段的執行緒共用一次爬取
+        self._leg_cache: "OrderedDict[Tuple[str, str, str], Future]" = OrderedDict()
+        self._leg_cache_lock = threading.Lock()
+    
+    def _get_scraper(self):
+        """取得目前執行緒專用的爬蟲，第一次使用時建立"""
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            scraper = self.scraper_class(headless=self.headless)
+            if self.reuses_browser:
+                # 同一執行緒的所有查詢共用一個瀏覽器
+                scraper.open()
+            self._local.scraper = scraper
+            with self._thread_scrapers_lock:
+                self._thread_scrapers.append(scraper)
+        return scraper
+    
+    def _cached_search(self, departure: str, arrival: str, departure_date: str) -> FlightSearchResult:
+        """搜尋單程航班，相同航段與日期只爬取一次"""
+        key = (departure, arrival, departure_date)
+        
+        with self._leg_cache_lock:
+            future = self._leg_cache.get(key)
+            if future is not None:
+                self._leg_cache.move_to_end(key)
+                is_owner = False
+            else:
+                future = self._leg_cache[key] = Future()
+                is_owner = True
+                while len(self._leg_cache) > self.LEG_CACHE_SIZE:
+                    self._leg_cache.popitem(last=False)
+        
+        if not is_owner:
+            return future.result()
+        
+        try:
+            result = self._get_scraper().search_flights(
+                departure=departure,
+                arrival=arrival,
+                departure_date=departure_date
+            )
+        except BaseException as e:
+            self._evict_leg(key, future)
+            future.set_exception(e)
+            raise
+        
+        # 搜尋失敗的結果不保留，之後再遇到相同航段時重新爬取
+        if result.errors:
+            self._evict_leg(key, future)
+        future.set_result(result)
+        return result
+    
+    def _evict_leg(self, key: Tuple[str, str, str], future: Future):
+        """從快取移除指定航段（僅在仍是同一次查詢時）"""
+        with self._leg_cache_lock:
+            if self._leg_cache.get(key) is future:
+                del self._leg_cache[key]
     
-    def get_search_dates(self, days_ahead: int = 30) -> List[str]:
+    def _close_thread_scrapers(self):
+        """關閉所有執行緒建立的爬蟲"""
+        with self._thread_scrapers_lock:
+            scrapers, self._thread_scrapers = self._thread_scrapers, []
+        for scraper in scrapers:
+            try:
+                if self.reuses_browser:
+                    scraper.close()
+                elif scraper.driver:
+                    scraper.driver.quit()
+            except Exception as e:
+                logger.warning(f"關閉瀏覽器失敗: {str(e)}")
+        self._local = threading.local()
+    
+    def get_search_dates(self, days_ahead: int = 30) -> List[Tuple[str, str]]:
         """
         取得搜尋日期範圍
         
@@ -78,13 +181,14 @@ class JapanCheapestFlightFinder:
             days_ahead: 未來多少天內
             
         Returns:
-            List[str]: 日期字串列表
+            List[Tuple[str, str]]: (出發日期, 回程日期) 字串列表
         """
         today = datetime.now().date()
+        trip_length = timedelta(days=self.trip_duration - 1)
         dates = []
         for i in range(1, days_ahead + 1):
             search_date = today + timedelta(days=i)
-            dates.append(search_date.strftime("%Y-%m-%d"))
+            dates.append((search_date.isoformat(), (search_date + trip_length).isoformat()))
         return dates
     
     def calculate_return_date(self, departure_date: str) -> str:
@@ -97,69 +201,71 @@ class JapanCheapestFlightFinder:
         Returns:
             str: 回程日期 (YYYY-MM-DD)
         """
-        departure = datetime.strptime(departure_date, "%Y-%m-%d").date()
+        departure = date.fromisoformat(departure_date)
         return_date = departure + timedelta(days=self.trip_duration - 1)
-        return return_date.strftime("%Y-%m-%d")
+        return return_date.isoformat()
     
-    def search_round_trip_flights(self, route: str, departure_date: str) -> Tuple[Optional[FlightInfo], Optional[FlightInfo], Optional[float]]:
+    def search_round_trip_flights(self, route: str, departure_date: str,
+                                  return_date: Optional[str] = None) -> Tuple[Optional[FlightInfo], Optional[FlightInfo], Optional[float]]:
         """
         搜尋來回機票
         
         Args:
             route: 航線代碼
             departure_date: 出發日期
+            return_date: 回程日期，未指定時依行程天數計算
             
         Returns:
             Tuple[出發航班, 回程航班, 總價格]
         """
         try:
             route_info = self.target_routes[route]
-            return_date = self.calculate_return_date(departure_date)
+            dep_airport = route_info["from"]
+            arr_airport = route_info["to"]
+            route_name = route_info["route_name"]
+            if return_date is None:
+                return_date = self.calculate_return_date(departure_date)
             
-            logger.info(f"搜尋 {route_info['route_name']} - 出發: {departure_date}, 回程: {return_date}")
+            logger.info(f"搜尋 {route_name} - 出發: {departure_date}, 回程: {return_date}")
             
             # 搜尋去程航班
-            outbound_result = self.scraper.search_flights(
-                departure=route_info["from"],
-                arrival=route_info["to"],
-                departure_date=departure_date
-            )
+            outbound_result = self._cached_search(dep_airport, arr_airport, departure_date)
             
             # 搜尋回程航班
-            inbound_result = self.scraper.search_flights(
-                departure=route_info["to"],
-                arrival=route_info["from"],
-                departure_date=return_date
-            )
-            
-            # 取得有空位且有價格的航班
-            outbound_flights = [f for f in outbound_result.get_available_flights() if f.price is not None]
-            inbound_flights = [f for f in inbound_result.get_available_flights() if f.price is not None]
+            inbound_result = self._cached_search(arr_airport, dep_airport, return_date)
             
-            if not outbound_flights or not inbound_flights:
-                logger.warning(f"沒有找到可用的來回航班組合: {route_info['route_name']} {departure_date}")
-                return None, None, None
-            
-            # 找到最便宜的組合
-            cheapest_outbound = min(outbound_flights, key=lambda x: x.price)
-            cheapest_inbound = min(inbound_flights, key=lambda x: x.price)
-            total_price = cheapest_outbound.price + cheapest_inbound.price
-            
-            logger.info(f"找到最便宜組合: 去程 NT${cheapest_outbound.price:,.0f} + 回程 NT${cheapest_inbound.price:,.0f} = 總計 NT${total_price:,.0f}")
-            
-            return cheapest_outbound, cheapest_inbound, total_price
+            return self._pick_round_trip(route_name, departure_date, outbound_result, inbound_result)
             
         except Exception as e:
             logger.error(f"搜尋來回航班時發生錯誤: {str(e)}")
             return None, None, None
     
-    def find_cheapest_trips(self, days_ahead: int = 30, max_results: int = 10) -> List[Dict]:
+    def _pick_round_trip(self, route_name: str, departure_date: str,
+                         outbound_result: FlightSearchResult,
+                         inbound_result: FlightSearchResult) -> Tuple[Optional[FlightInfo], Optional[FlightInfo], Optional[float]]:
+        """從去程、回程的搜尋結果中挑出最便宜的組合"""
+        # 找到有空位且有價格的航班中最便宜的組合（同一航段的結果會被多個行程共用，只計算一次）
+        cheapest_outbound = outbound_result.cheapest_available()
+        cheapest_inbound = inbound_result.cheapest_available()
+        
+        if cheapest_outbound is None or cheapest_inbound is None:
+            logger.warning(f"沒有找到可用的來回航班組合: {route_name} {departure_date}")
+            return None, None, None
+        
+        total_price = cheapest_outbound.price + cheapest_inbound.price
+        
+        logger.info(f"找到最便宜組合: 去程 NT${cheapest_outbound.price:,.0f} + 回程 NT${cheapest_inbound.price:,.0f} = 總計 NT${total_price:,.0f}")
+        
+        return cheapest_outbound, cheapest_inbound, total_price
+    
+    def find_cheapest_trips(self, days_ahead: int = 30, max_results: int = 10, workers: int = 4) -> List[Dict]:
         """
         查詢最便宜的旅行組合
         
         Args:
             days_ahead: 搜尋未來多少天
             max_results: 最多返回幾個結果
+            workers: 同時搜尋的瀏覽器數量（Safari只能同時開啟一個，固定為1）
             
         Returns:
             List[Dict]: 最便宜旅行組合列表
@@ -167,48 +273,45 @@ class JapanCheapestFlightFinder:
         all_trips = []
         search_dates = self.get_search_dates(days_ahead)
         
-        print("="*80)
-        print("🛫 開始搜尋日本最便宜五天四夜來回機票")
-        print("="*80)
-        print(f"搜尋航線: {', '.join([info['route_name'] for info in self.target_routes.values()])}")
-        print(f"搜尋期間: 未來 {days_ahead} 天")
-        print(f"行程天數: {self.trip_duration} 天 {self.trip_duration-1} 夜")
-        print("="*80)
+        sys.stdout.write("\n".join([
+            "="*80,
+            "🛫 開始搜尋日本最便宜五天四夜來回機票",
+            "="*80,
+            f"搜尋航線: {', '.join([info['route_name'] for info in self.target_routes.values()])}",
+            f"搜尋期間: 未來 {days_ahead} 天",
+            f"行程天數: {self.trip_duration} 天 {self.trip_duration-1} 夜",
+            "="*80
+        ]) + "\n")
+        
+        if not self.reuses_browser:
+            workers = 1
+        
+        # 每次查詢重新爬取，不沿用上一次查詢的票價
+        with self._leg_cache_lock:
+            self._leg_cache.clear()
+        
+        # 先列出所有不重複的單程航段：去程 (出發地, 目的地, 出發日期) 與回程 (目的地, 出發地, 回程日期)
+        legs = list(dict.fromkeys(
+            leg
+            for route_info in self.target_routes.values()
+            for departure_date, return_date in search_dates
+            for leg in ((route_info["from"], route_info["to"], departure_date),
+                        (route_info["to"], route_info["from"], return_date))
+        ))
+        leg_results = {}
+        
+        executor = ThreadPoolExecutor(max_workers=workers)
         
         try:
-            for route in self.target_routes.keys():
-                route_name = self.target_routes[route]['route_name']
-                print(f"\n🔍 正在搜尋 {route_name}...")
-                
-                for departure_date in search_dates:
-                    outbound, inbound, total_price = self.search_round_trip_flights(route, departure_date)
-                    
-                    if outbound and inbound and total_price:
-                        trip_info = {
-                            'route': route,
-                            'route_name': route_name,
-                            'departure_date': departure_date,
-                            'return_date': self.calculate_return_date(departure_date),
-                            'outbound_flight': {
-                                'flight_number': outbound.flight_number,
-                                'departure_time': outbound.departure_time,
-                                'arrival_time': outbound.arrival_time,
-                                'price': outbound.price
-                            },
-                            'inbound_flight': {
-                                'flight_number': inbound.flight_number,
-                                'departure_time': inbound.departure_time,
-                                'arrival_time': inbound.arrival_time,
-                                'price': inbound.price
-                            },
-                            'total_price': total_price,
-                            'price_per_day': total_price / self.trip_duration
-                        }
-                        all_trips.append(trip_info)
-                        
-                        print(f"  ✅ {departure_date}: NT$ {total_price:,.0f}")
-                    else:
-                        print(f"  ❌ {departure_date}: 無可用航班")
+            futures = {executor.submit(self._cached_search, *leg): leg for leg in legs}
+            print(f"\n🔍 共 {len(futures)} 個單程航段，以 {workers} 個瀏覽器同時搜尋...")
+            
+            for future in as_completed(futures):
+                leg = futures[future]
+                try:
+                    leg_results[leg] = future.result()
+                except Exception as e:
+                    logger.error(f"搜尋航段 {leg[0]}->{leg[1]} {leg[2]} 時發生錯誤: {str(e)}")
         
         except KeyboardInterrupt:
             print("\n\n⏹️  搜尋被使用者中斷")
@@ -217,14 +320,55 @@ class JapanCheapestFlightFinder:
             logger.error(f"搜尋過程中發生錯誤: {str(e)}")
         
         finally:
-            # 關閉瀏覽器
-            if self.scraper.driver:
-                self.scraper.driver.quit()
+            # 取消尚未開始的搜尋，並關閉所有瀏覽器
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._close_thread_scrapers()
         
-        # 按總價格排序
-        all_trips.sort(key=lambda x: x['total_price'])
+        # 以已取得的航段組合來回行程，不再發出任何查詢（中斷時也使用已完成的部分）
+        for route, route_info in self.target_routes.items():
+            route_name = route_info['route_name']
+            print(f"\n✈️  {route_name}")
+            
+            for departure_date, return_date in search_dates:
+                outbound_result = leg_results.get((route_info["from"], route_info["to"], departure_date))
+                inbound_result = leg_results.get((route_info["to"], route_info["from"], return_date))
+                
+                if outbound_result is None or inbound_result is None:
+                    outbound, inbound, total_price = None, None, None
+                else:
+                    outbound, inbound, total_price = self._pick_round_trip(
+                        route_name, departure_date, outbound_result, inbound_result
+                    )
+                
+                if outbound and inbound and total_price:
+                    trip_info = {
+                        'route': route,
+                        'route_name': route_name,
+                        'departure_date': departure_date,
+                        'return_date': return_date,
+                        'outbound_flight': {
+                            'flight_number': outbound.flight_number,
+                            'departure_time': outbound.departure_time,
+                            'arrival_time': outbound.arrival_time,
+                            'price': outbound.price
+                        },
+                        'inbound_flight': {
+                            'flight_number': inbound.flight_number,
+                            'departure_time': inbound.departure_time,
+                            'arrival_time': inbound.arrival_time,
+                            'price': inbound.price
+                        },
+                        'total_price': total_price,
+                        'price_per_day': total_price / self.trip_duration
+                    }
+                    all_trips.append(trip_info)
+                    
+                    print(f"  ✅ {departure_date}: NT$ {total_price:,.0f}")
+                else:
+                    print(f"  ❌ {departure_date}: 無可用航班")
         
-        return all_trips[:max_results]
+        # 依總價格取前幾名
+        return heapq.nsmallest(max_results, all_trips, key=lambda t: t['total_price'])
     
     def display_results(self, trips: List[Dict]):
         """
@@ -237,20 +381,25 @@ class JapanCheapestFlightFinder:
             print("\n❌ 沒有找到任何可用的航班組合")
             return
         
-        print(f"\n🏆 找到 {len(trips)} 個最便宜的五天四夜旅行組合")
-        print("="*80)
+        # 先組好所有內容再一次輸出
+        lines = [
+            f"\n🏆 找到 {len(trips)} 個最便宜的五天四夜旅行組合",
+            "="*80
+        ]
         
         for i, trip in enumerate(trips, 1):
-            print(f"\n【第 {i} 名】{trip['route_name']}")
-            print(f"📅 旅行日期: {trip['departure_date']} ~ {trip['return_date']}")
-            print(f"💰 總價格: NT$ {trip['total_price']:,.0f} (平均每天 NT$ {trip['price_per_day']:,.0f})")
-            print(f"✈️  去程: {trip['outbound_flight']['flight_number']} "
-                  f"{trip['outbound_flight']['departure_time']}-{trip['outbound_flight']['arrival_time']} "
-                  f"NT$ {trip['outbound_flight']['price']:,.0f}")
-            print(f"✈️  回程: {trip['inbound_flight']['flight_number']} "
-                  f"{trip['inbound_flight']['departure_time']}-{trip['inbound_flight']['arrival_time']} "
-                  f"NT$ {trip['inbound_flight']['price']:,.0f}")
-            print("-" * 50)
+            lines.append(f"\n【第 {i} 名】{trip['route_name']}")
+            lines.append(f"📅 旅行日期: {trip['departure_date']} ~ {trip['return_date']}")
+            lines.append(f"💰 總價格: NT$ {trip['total_price']:,.0f} (平均每天 NT$ {trip['price_per_day']:,.0f})")
+            lines.append(f"✈️  去程: {trip['outbound_flight']['flight_number']} "
+                         f"{trip['outbound_flight']['departure_time']}-{trip['outbound_flight']['arrival_time']} "
+                         f"NT$ {trip['outbound_flight']['price']:,.0f}")
+            lines.append(f"✈️  回程: {trip['inbound_flight']['flight_number']} "
+                         f"{trip['inbound_flight']['departure_time']}-{trip['inbound_flight']['arrival_time']} "
+                         f"NT$ {trip['inbound_flight']['price']:,.0f}")
+            lines.append("-" * 50)
+        
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def save_results(self, trips: List[Dict], filename_prefix: str = "japan_cheapest_trips"):
         """
@@ -267,11 +416,11 @@ class JapanCheapestFlightFinder:
         
         # 儲存為CSV
         csv_filename = f"{filename_prefix}_{timestamp}.csv"
-        df_data = []
+        rows = []
         
-        for trip in trips:
-            df_data.append({
-                '排名': trips.index(trip) + 1,
+        for rank, trip in enumerate(trips, 1):
+            rows.append({
+                '排名': rank,
                 '航線': trip['route_name'],
                 '出發日期': trip['departure_date'],
                 '回程日期': trip['return_date'],
@@ -285,13 +434,19 @@ class JapanCheapestFlightFinder:
                 '回程價格': trip['inbound_flight']['price']
             })
         
-        df = pd.DataFrame(df_data)
-        df.to_csv(csv_filename, index=False, encoding='utf-8-sig')
+        with open(csv_filename, 'w', newline='', encoding='utf-8-sig', buffering=WRITE_BUFFER_SIZE) as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
         
         # 儲存為JSON
         json_filename = f"{filename_prefix}_{timestamp}.json"
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(trips, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            with open(json_filename, 'wb') as f:
+                f.write(orjson.dumps(trips, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(json_filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                json.dump(trips, f, ensure_ascii=False, indent=2)
         
         print(f"\n💾 搜尋結果已儲存:")
         print(f"   📊 CSV檔案: {csv_filename}")
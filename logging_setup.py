@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日誌設定
+
+各模組在載入時呼叫 configure_logging()，只有第一次呼叫（根記錄器尚無處理器時）
+會實際設定，之後的呼叫直接返回，不會再建立處理器或開啟日誌檔案。
+"""
+
+import logging
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(log_file: Optional[str] = None) -> None:
+    """
+    設定根記錄器（已設定過則略過）
+
+    Args:
+        log_file: 額外寫入的日誌檔案路徑 (可選)
+    """
+    if logging.getLogger().handlers:
+        return
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file, encoding='utf-8'))
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=handlers)
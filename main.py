@@ -3,18 +3,15 @@
 
 import argparse
 import sys
-from datetime import datetime, timedelta
 import logging
 
 from tigerair_scraper import TigerairScraper
 from config import TigerairConfig
 from models import FlightSearchResult
+from logging_setup import configure_logging
 
 # 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def main():
@@ -104,11 +101,10 @@ def main():
         dates = args.date
     else:
         # 產生未來N天的日期
-        today = datetime.now().date()
-        dates = []
-        for i in range(1, args.days + 1):
-            search_date = today + timedelta(days=i)
-            dates.append(search_date.strftime("%Y-%m-%d"))
+        dates = TigerairConfig.get_default_search_dates(args.days)
+    
+    # 航線名稱只查一次，顯示資訊與統計結果共用
+    route_names = {r: TigerairConfig.ROUTES[r]['route_name'] for r in routes}
     
     # 決定瀏覽器模式
     headless = args.headless and not args.show_browser
@@ -117,7 +113,7 @@ def main():
     print("="*60)
     print("🛫 虎航機票爬蟲開始執行")
     print("="*60)
-    print(f"搜尋航線: {', '.join([TigerairConfig.ROUTES[r]['route_name'] for r in routes])}")
+    print(f"搜尋航線: {', '.join(route_names.values())}")
     print(f"搜尋日期: {', '.join(dates[:5])}" + ("..." if len(dates) > 5 else ""))
     print(f"瀏覽器模式: {'無頭模式' if headless else '顯示視窗'}")
     print(f"輸出格式: {args.format}")
@@ -140,7 +136,7 @@ def main():
         print("="*60)
         
         for route, result in results.items():
-            route_name = TigerairConfig.ROUTES[route]['route_name']
+            route_name = route_names[route]
             print(f"{route_name}: {result.success_count} 筆航班, {result.error_count} 個錯誤")
             
             # 顯示可用航班摘要
@@ -1,11 +1,44 @@
-from dataclasses import dataclass
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from operator import attrgetter
 from datetime import datetime
+import heapq
 from typing import Optional, List
 import json
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # 未安裝orjson時改用標準函式庫json
+    orjson = None
+
+@dataclass(frozen=True, slots=True)
+class FlightInfoResponse:
+    """API回應中的航班資訊（orjson可直接序列化，不需轉成dict）"""
+    
+    flight_number: str
+    departure_time: str
+    arrival_time: str
+    departure_date: str
+    price: Optional[float]
+    seats_available: Optional[bool]
+    time_slot: str
+
+# 依 FlightInfoResponse 欄位順序一次取出航班屬性
+_get_response_fields = attrgetter(*(field.name for field in fields(FlightInfoResponse)))
+
+def _dumps(obj) -> str:
+    """序列化為縮排2格的JSON字串，有orjson時使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+# 同一批解析共用的爬取時間戳記（見 FlightInfo.batch_timestamp）
+_batch_timestamp: ContextVar[Optional[str]] = ContextVar('flight_batch_timestamp', default=None)
+
+@dataclass(slots=True)
 class FlightInfo:
-    """航班資訊資料模型"""
+    """航班資訊資料模型（使用__slots__，大量航班時較省記憶體）"""
     
     # 基本航班資訊
     flight_number: str              # 航班號碼
@@ -44,36 +77,33 @@ class FlightInfo:
     def __post_init__(self):
         """初始化後處理"""
         if not self.crawl_timestamp:
-            self.crawl_timestamp = datetime.now().isoformat()
+            self.crawl_timestamp = _batch_timestamp.get() or datetime.now().isoformat()
+    
+    @staticmethod
+    @contextmanager
+    def batch_timestamp():
+        """在此區塊內建立的航班共用同一個爬取時間戳記，不必每筆各自取得目前時間"""
+        token = _batch_timestamp.set(datetime.now().isoformat())
+        try:
+            yield
+        finally:
+            _batch_timestamp.reset(token)
     
     def to_dict(self) -> dict:
         """轉換為字典格式"""
-        return {
-            'flight_number': self.flight_number,
-            'airline': self.airline,
-            'departure_airport': self.departure_airport,
-            'departure_city': self.departure_city,
-            'departure_time': self.departure_time,
-            'departure_date': self.departure_date,
-            'arrival_airport': self.arrival_airport,
-            'arrival_city': self.arrival_city,
-            'arrival_time': self.arrival_time,
-            'arrival_date': self.arrival_date,
-            'price': self.price,
-            'currency': self.currency,
-            'fare_type': self.fare_type,
-            'seats_available': self.seats_available,
-            'seats_count': self.seats_count,
-            'flight_duration': self.flight_duration,
-            'aircraft_type': self.aircraft_type,
-            'time_slot': self.time_slot,
-            'crawl_timestamp': self.crawl_timestamp,
-            'source_url': self.source_url
-        }
+        return dict(zip(_FLIGHT_FIELDS, _get_flight_fields(self)))
     
     def to_json(self) -> str:
         """轉換為JSON格式"""
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        return _dumps(self.to_dict())
+
+    def to_response(self) -> FlightInfoResponse:
+        """轉換為API回應格式"""
+        return FlightInfoResponse(*_get_response_fields(self))
+
+# FlightInfo 的欄位名稱，依宣告順序；新增欄位時 to_dict 自動包含
+_FLIGHT_FIELDS = tuple(field.name for field in fields(FlightInfo))
+_get_flight_fields = attrgetter(*_FLIGHT_FIELDS)
 
 class FlightSearchResult:
     """航班搜尋結果集合"""
@@ -85,12 +115,28 @@ class FlightSearchResult:
         self.success_count = 0
         self.error_count = 0
         self.errors: List[str] = []
+        self._cheapest_available: Optional[FlightInfo] = None
+        self._cheapest_checked = False
+        # 是否有任何有空位（且有價格）的航班，沒有時篩選方法直接回傳空結果
+        self._has_available = False
+        self._has_priced_available = False
     
     def add_flight(self, flight: FlightInfo):
-        """新增航班資訊"""
+        """
+        新增航班資訊
+        
+        是否有空位（有價格）的旗標以加入當下的值為準，加入後再修改航班的
+        price/seats_available 時，篩選方法可能直接回傳空結果。
+        """
+        if flight.seats_available:
+            self._has_available = True
+            if flight.price is not None:
+                self._has_priced_available = True
+        
         self.flights.append(flight)
         self.total_count += 1
         self.success_count += 1
+        self._cheapest_checked = False
     
     def add_error(self, error_msg: str):
         """新增錯誤訊息"""
@@ -103,12 +149,36 @@ class FlightSearchResult:
     
     def get_available_flights(self) -> List[FlightInfo]:
         """取得有空位的航班"""
+        if not self._has_available:
+            return []
         return [flight for flight in self.flights if flight.seats_available]
     
+    def get_response_flights(self) -> List[FlightInfoResponse]:
+        """取得API回應格式的航班列表"""
+        return [flight.to_response() for flight in self.flights]
+    
+    def cheapest_available(self) -> Optional[FlightInfo]:
+        """取得有空位且有價格的航班中最便宜的一筆（結果會保留，新增航班後重新計算）"""
+        if not self._has_priced_available:
+            return None
+        if not self._cheapest_checked:
+            best = None
+            for flight in self.flights:
+                if flight.seats_available and flight.price is not None and (best is None or flight.price < best.price):
+                    best = flight
+            self._cheapest_available = best
+            self._cheapest_checked = True
+        return self._cheapest_available
+    
     def get_cheapest_flights(self, limit: int = 5) -> List[FlightInfo]:
         """取得最便宜的航班"""
-        available_flights = [f for f in self.flights if f.price is not None and f.seats_available]
-        return sorted(available_flights, key=lambda x: x.price)[:limit]
+        if not self._has_priced_available:
+            return []
+        return heapq.nsmallest(
+            limit,
+            (f for f in self.flights if f.price is not None and f.seats_available),
+            key=lambda x: x.price
+        )
     
     def to_dict(self) -> dict:
         """轉換為字典格式"""
@@ -125,4 +195,19 @@ class FlightSearchResult:
     
     def to_json(self) -> str:
         """轉換為JSON格式"""
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2) 
\ No newline at end of file
+        return _dumps(self.to_dict())
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'FlightSearchResult':
+        """由 to_dict 的輸出還原搜尋結果"""
+        result = cls()
+        result.search_params = data.get('search_params', {})
+        for flight in data.get('flights', []):
+            result.add_flight(FlightInfo(**flight))
+        
+        summary = data.get('summary', {})
+        for error in summary.get('errors', []):
+            result.add_error(error)
+        result.total_count = summary.get('total_count', result.total_count)
+        result.success_count = summary.get('success_count', result.success_count)
+        return result
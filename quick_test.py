@@ -6,15 +6,59 @@
 獲取實際的完整價格，而非概略價格
 """
 
-from chrome_fix_scraper import FixedChromeScraper
+from chrome_fix_scraper import FixedChromeScraper, RESULT_READY_SELECTOR
+from config import TigerairConfig
 from models import FlightInfo
+from logging_setup import configure_logging
+import scraper_http
+import asyncio
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import logging
+import re
+import sys
+from collections import namedtuple
+from operator import attrgetter
 from datetime import datetime
 import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# 搜尋結果頁的價格、航班、結果關鍵字（不分大小寫）；航班號碼另以 KNOWN_FLIGHT_CODES 確認
+RESULT_KEYWORDS_RE = re.compile(
+    r'(?P<price>twd|nt\$|價格|price)'
+    r'|(?P<code>it\d{3})|(?P<flight>航班)'
+    r'|(?P<result>搜尋結果|search result|查詢結果)',
+    re.IGNORECASE
+)
+
+# 去程與回程航班組合（單人總價）
+PriceCombination = namedtuple('PriceCombination', 'out_flight in_flight total_single')
+
+# 報告中每個航班、每個組合固定格式的段落，一次格式化成一個字串
+FLIGHT_PRICE_TEMPLATE = (
+    "  💰 精確價格: NT$ {price:,.0f} (單人)\n"
+    "  👥 2人價格: NT$ {price_double:,.0f}\n"
+    "  🔗 官網: https://www.tigerair.com/tw/zh/\n"
+).format
+COMBINATION_TEMPLATE = (
+    "\n【第 {rank} 名】總價 NT$ {total_double:,} (2人)\n"
+    "  去程: {out_number} {out_dep}-{out_arr}\n"
+    "        NT$ {out_price:,} (單人)\n"
+    "  回程: {in_number} {in_dep}-{in_arr}\n"
+    "        NT$ {in_price:,} (單人)\n"
+    "  單人總計: NT$ {total_single:,}\n"
+    "  平均每天: NT$ {per_day:,} (單人)"
+).format
+
+# 台北桃園-東京成田的航班號碼
+KNOWN_FLIGHT_CODES = frozenset({'it200', 'it201', 'it202', 'it203'})
+
 def test_precise_price_query():
     """查詢虎航精確價格"""
     print("🛫 東京五天四夜行程 - 精確價格查詢")
@@ -26,64 +70,59 @@ def test_precise_price_query():
     print("🎯 目標: 獲取實際精確價格")
     print("=" * 60)
     
+    outbound_query = {'departure': "TPE", 'arrival': "NRT", 'departure_date': "2025-06-02"}
+    inbound_query = {'departure': "NRT", 'arrival': "TPE", 'departure_date': "2025-06-06"}
+    
     try:
-        scraper = FixedChromeScraper(headless=False)  # 使用可見模式方便除錯
-        
-        print("\n🔍 正在查詢去程航班精確價格...")
-        outbound_result = scraper.search_flights(
-            departure="TPE",
-            arrival="NRT", 
-            departure_date="2025-06-02"
-        )
+        results = None
+        if scraper_http.is_enabled():
+            print("\n🔍 正在直接查詢去程與回程航班精確價格...")
+            try:
+                results = asyncio.run(query_precise_prices_http(outbound_query, inbound_query))
+            except scraper_http.ScrapeError as e:
+                print(f"⚠️  直接HTTP查詢失敗，改用瀏覽器: {str(e)}")
         
-        print("🔍 正在查詢回程航班精確價格...")
-        time.sleep(3)  # 給更多時間讓頁面載入
-        inbound_result = scraper.search_flights(
-            departure="NRT",
-            arrival="TPE",
-            departure_date="2025-06-06"
-        )
+        if results is None:
+            # Chrome驅動不可跨執行緒共用，去程與回程各用一個瀏覽器同時查詢
+            print("\n🔍 正在同時查詢去程與回程航班精確價格...")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                outbound_future = executor.submit(
+                    FixedChromeScraper(headless=False).search_flights, **outbound_query  # 使用可見模式方便除錯
+                )
+                inbound_future = executor.submit(
+                    FixedChromeScraper(headless=False).search_flights, **inbound_query
+                )
+                outbound_result, inbound_result = outbound_future.result(), inbound_future.result()
+        else:
+            outbound_result, inbound_result = results
         
         # 獲取精確價格數據
         outbound_flights = [f for f in outbound_result.get_available_flights() if f.price and f.price > 0]
         inbound_flights = [f for f in inbound_result.get_available_flights() if f.price and f.price > 0]
         
-        print(f"\n📊 精確價格查詢結果:")
-        print(f"• 去程航班: {len(outbound_flights)} 班找到精確價格")
-        print(f"• 回程航班: {len(inbound_flights)} 班找到精確價格")
-        print(f"• 查詢時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        # 先組好所有內容再一次輸出
+        lines = [
+            f"\n📊 精確價格查詢結果:",
+            f"• 去程航班: {len(outbound_flights)} 班找到精確價格",
+            f"• 回程航班: {len(inbound_flights)} 班找到精確價格",
+            f"• 查詢時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        ]
         
         if outbound_flights:
-            print(f"\n✈️  去程航班精確價格 (TPE → NRT, 6/2):")
-            print("-" * 50)
-            for i, flight in enumerate(outbound_flights, 1):
-                print(f"【航班 {i}】{flight.flight_number}")
-                if flight.departure_time:
-                    print(f"  🕐 起飛: {flight.departure_time}")
-                if flight.arrival_time:
-                    print(f"  🕐 降落: {flight.arrival_time}")
-                print(f"  💰 精確價格: NT$ {flight.price:,.0f} (單人)")
-                print(f"  👥 2人價格: NT$ {flight.price * 2:,.0f}")
-                print(f"  🔗 官網: https://www.tigerair.com/tw/zh/")
-                print()
+            lines.append(f"\n✈️  去程航班精確價格 (TPE → NRT, 6/2):")
+            lines.append("-" * 50)
+            append_flight_price_lines(lines, outbound_flights)
         else:
-            print("\n❌ 去程航班未找到精確價格")
+            lines.append("\n❌ 去程航班未找到精確價格")
             
         if inbound_flights:
-            print(f"✈️  回程航班精確價格 (NRT → TPE, 6/6):")
-            print("-" * 50)
-            for i, flight in enumerate(inbound_flights, 1):
-                print(f"【航班 {i}】{flight.flight_number}")
-                if flight.departure_time:
-                    print(f"  🕐 起飛: {flight.departure_time}")
-                if flight.arrival_time:
-                    print(f"  🕐 降落: {flight.arrival_time}")
-                print(f"  💰 精確價格: NT$ {flight.price:,.0f} (單人)")
-                print(f"  👥 2人價格: NT$ {flight.price * 2:,.0f}")
-                print(f"  🔗 官網: https://www.tigerair.com/tw/zh/")
-                print()
+            lines.append(f"✈️  回程航班精確價格 (NRT → TPE, 6/6):")
+            lines.append("-" * 50)
+            append_flight_price_lines(lines, inbound_flights)
         else:
-            print("\n❌ 回程航班未找到精確價格")
+            lines.append("\n❌ 回程航班未找到精確價格")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
         
         # 如果都有精確價格，進行組合分析
         if outbound_flights and inbound_flights:
@@ -100,42 +139,57 @@ def test_precise_price_query():
         provide_fallback_with_manual_check()
         return False
 
-def analyze_precise_combinations(outbound_flights, inbound_flights):
-    """分析精確價格組合"""
-    print("\n🎯 精確價格組合分析:")
-    print("=" * 50)
-    
-    combinations = []
-    for out_flight in outbound_flights:
-        for in_flight in inbound_flights:
-            total_single = out_flight.price + in_flight.price
-            total_double = total_single * 2
-            
-            combinations.append({
-                'out_flight': out_flight,
-                'in_flight': in_flight,
-                'total_single': total_single,
-                'total_double': total_double
-            })
+def append_flight_price_lines(lines, flights):
+    """將各航班的精確價格加入輸出內容"""
+    for i, flight in enumerate(flights, 1):
+        departure_time, arrival_time, price = flight.departure_time, flight.arrival_time, flight.price
+        lines.append(f"【航班 {i}】{flight.flight_number}")
+        if departure_time:
+            lines.append(f"  🕐 起飛: {departure_time}")
+        if arrival_time:
+            lines.append(f"  🕐 降落: {arrival_time}")
+        lines.append(FLIGHT_PRICE_TEMPLATE(price=price, price_double=price * 2))
+
+async def query_precise_prices_http(outbound_query, inbound_query):
+    """直接呼叫查詢端點，同時查詢去程與回程航班"""
+    async with httpx.AsyncClient(
+        headers=TigerairConfig.HEADERS,
+        timeout=TigerairConfig.HTTP_TIMEOUT,
+        follow_redirects=True
+    ) as client:
+        return await asyncio.gather(
+            scraper_http.search_flights(client, **outbound_query),
+            scraper_http.search_flights(client, **inbound_query)
+        )
+
+def analyze_precise_combinations(outbound_flights, inbound_flights, top_k=10):
+    """分析精確價格組合（只列出最便宜的前top_k組）"""
+    lines = ["\n🎯 精確價格組合分析:", "=" * 50]
     
-    # 按價格排序
-    combinations.sort(key=lambda x: x['total_double'])
+    # 只保留最便宜的前top_k組，不必排序全部組合
+    combinations = (
+        PriceCombination(out_flight, in_flight, out_flight.price + in_flight.price)
+        for out_flight in outbound_flights
+        for in_flight in inbound_flights
+    )
+    top_combinations = heapq.nsmallest(top_k, combinations, key=attrgetter('total_single'))
     
-    print("💰 精確價格排名 (2人總價):")
-    for i, combo in enumerate(combinations, 1):
-        out_time = f"{combo['out_flight'].departure_time or '待確認'}-{combo['out_flight'].arrival_time or '待確認'}"
-        in_time = f"{combo['in_flight'].departure_time or '待確認'}-{combo['in_flight'].arrival_time or '待確認'}"
+    lines.append("💰 精確價格排名 (2人總價):")
+    for i, (out_flight, in_flight, total_single) in enumerate(top_combinations, 1):
+        total_double = total_single * 2
+        out_dep, out_arr = out_flight.departure_time or '待確認', out_flight.arrival_time or '待確認'
+        in_dep, in_arr = in_flight.departure_time or '待確認', in_flight.arrival_time or '待確認'
         
-        print(f"\n【第 {i} 名】總價 NT$ {combo['total_double']:,} (2人)")
-        print(f"  去程: {combo['out_flight'].flight_number} {out_time}")
-        print(f"        NT$ {combo['out_flight'].price:,} (單人)")
-        print(f"  回程: {combo['in_flight'].flight_number} {in_time}")
-        print(f"        NT$ {combo['in_flight'].price:,} (單人)")
-        print(f"  單人總計: NT$ {combo['total_single']:,}")
-        print(f"  平均每天: NT$ {combo['total_single'] // 5:,} (單人)")
+        lines.append(COMBINATION_TEMPLATE(
+            rank=i, total_double=total_double, total_single=total_single, per_day=total_single // 5,
+            out_number=out_flight.flight_number, out_dep=out_dep, out_arr=out_arr, out_price=out_flight.price,
+            in_number=in_flight.flight_number, in_dep=in_dep, in_arr=in_arr, in_price=in_flight.price
+        ))
         
         if i == 1:
-            print(f"  🏆 最便宜精確組合！")
+            lines.append(f"  🏆 最便宜精確組合！")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def provide_fallback_with_manual_check():
     """提供手動確認方案"""
@@ -168,26 +222,28 @@ def enhanced_scraper_attempt():
     print("\n🔧 使用增強版爬蟲技術...")
     
     try:
-        # 使用更長的等待時間和多次嘗試
-        scraper = FixedChromeScraper(headless=False)
-        
-        # 多次嘗試獲取精確價格
-        for attempt in range(3):
-            print(f"嘗試第 {attempt + 1} 次獲取精確價格...")
-            
-            result = scraper.search_flights(
-                departure="TPE",
-                arrival="NRT",
-                departure_date="2025-06-02"
-            )
-            
-            flights_with_price = [f for f in result.get_available_flights() if f.price and f.price > 0]
-            
-            if flights_with_price:
-                print(f"✅ 第 {attempt + 1} 次嘗試成功，找到 {len(flights_with_price)} 個精確價格")
-                return flights_with_price
-            
-            time.sleep(5)  # 等待更久再試
+        # 使用更長的等待時間和多次嘗試，所有嘗試共用同一個瀏覽器
+        with FixedChromeScraper(headless=False) as scraper:
+            # 多次嘗試獲取精確價格
+            for attempt in range(3):
+                print(f"嘗試第 {attempt + 1} 次獲取精確價格...")
+                
+                result = scraper.search_flights(
+                    departure="TPE",
+                    arrival="NRT",
+                    departure_date="2025-06-02"
+                )
+                
+                flights_with_price = [f for f in result.get_available_flights() if f.price and f.price > 0]
+                
+                if flights_with_price:
+                    print(f"✅ 第 {attempt + 1} 次嘗試成功，找到 {len(flights_with_price)} 個精確價格")
+                    return flights_with_price
+                
+                # 清除上次查詢的Cookie再重試（查詢出錯時瀏覽器已關閉，下次會重新開啟）
+                if scraper.driver is not None:
+                    scraper.driver.delete_all_cookies()
+                time.sleep(5)  # 等待更久再試
         
         print("❌ 多次嘗試後仍無法獲取精確價格")
         return []
@@ -209,27 +265,27 @@ def test_dynamic_dropdown_interaction():
         scraper.driver = scraper._setup_chrome_driver()
         scraper.driver.get("https://www.tigerair.com/tw/zh/")
         
-        # 等待頁面載入完成
-        time.sleep(5)
+        # 等待出發地輸入框出現，出現即視為載入完成
+        scraper._find_first_visible(scraper._DEPARTURE_SELECTORS, 10)
         print("✅ 網站載入完成")
         
         print("\n📍 測試出發地下拉選單...")
         departure_success = scraper._select_dynamic_airport("TPE", is_departure=True)
         print(f"出發地設定結果: {'✅ 成功' if departure_success else '❌ 失敗'}")
         
-        time.sleep(2)
+        scraper._find_first_visible(scraper._ARRIVAL_SELECTORS, 5)
         
         print("📍 測試目的地下拉選單...")
         arrival_success = scraper._select_dynamic_airport("NRT", is_departure=False)
         print(f"目的地設定結果: {'✅ 成功' if arrival_success else '❌ 失敗'}")
         
-        time.sleep(2)
+        scraper._find_first_visible(scraper._DEPARTURE_DATE_SELECTORS, 5)
         
         print("📅 測試日期選擇器...")
         date_success = scraper._set_dynamic_date("2025-06-02")
         print(f"日期設定結果: {'✅ 成功' if date_success else '❌ 失敗'}")
         
-        time.sleep(2)
+        scraper._find_first_visible(scraper._SEARCH_BUTTON_SELECTORS, 5)
         
         print("🔍 測試搜尋按鈕...")
         search_success = scraper._click_search_button()
@@ -237,15 +293,31 @@ def test_dynamic_dropdown_interaction():
         
         if search_success:
             print("\n⏳ 等待搜尋結果載入...")
-            time.sleep(10)  # 給更多時間讓搜尋結果載入
+            # 結果頁為單頁應用，網址不一定改變，只等待航班元素出現
+            try:
+                scraper._wait(TigerairConfig.RESULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_READY_SELECTOR))
+                )
+            except TimeoutException:
+                print("⚠️  等待搜尋結果逾時，直接檢查頁面")
             
             print("📊 檢查是否有搜尋結果...")
             # 檢查頁面是否有價格或航班資訊
-            page_source = scraper.driver.page_source.lower()
+            # 一次掃描頁面，三類關鍵字都出現後即停止
+            found = set()
+            for match in RESULT_KEYWORDS_RE.finditer(scraper.driver.page_source):
+                kind = match.lastgroup
+                if kind == 'code':
+                    if match.group().lower() not in KNOWN_FLIGHT_CODES:
+                        continue
+                    kind = 'flight'
+                found.add(kind)
+                if len(found) == 3:
+                    break
             
-            has_prices = any(keyword in page_source for keyword in ['twd', 'nt$', '價格', 'price'])
-            has_flights = any(keyword in page_source for keyword in ['it200', 'it201', 'it202', 'it203', '航班'])
-            has_results = any(keyword in page_source for keyword in ['搜尋結果', 'search result', '查詢結果'])
+            has_prices = 'price' in found
+            has_flights = 'flight' in found
+            has_results = 'result' in found
             
             print(f"發現價格資訊: {'✅' if has_prices else '❌'}")
             print(f"發現航班資訊: {'✅' if has_flights else '❌'}")
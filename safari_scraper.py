@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import time
 import logging
 from typing import List, Optional, Dict, Tuple, Union
 from selenium import webdriver
@@ -11,15 +10,16 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.safari.options import Options as SafariOptions
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import platform
+import httpx
 
 from config import TigerairConfig
 from models import FlightInfo, FlightSearchResult
+from logging_setup import configure_logging
+from chrome_fix_scraper import RESULT_READY_SELECTOR
+import scraper_http
 
 # 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 class SafariTigerairScraper:
@@ -49,7 +49,8 @@ class SafariTigerairScraper:
             
             # 創建Safari驅動
             driver = webdriver.Safari(options=safari_options)
-            driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+            # 元素查找都使用顯式等待，隱式等待會讓每次找不到元素時多等 IMPLICIT_WAIT 秒
+            driver.implicitly_wait(0)
             
             logger.info("✅ Safari瀏覽器啟動成功")
             return driver
@@ -68,6 +69,10 @@ Safari啟動失敗: {str(e)}
             """
             raise Exception(error_msg)
     
+    def _wait(self, timeout: float) -> WebDriverWait:
+        """建立以較短間隔輪詢的顯式等待，條件一成立就立即繼續"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.config.SELENIUM_POLL_FREQUENCY)
+    
     def search_flights(self, 
                       departure: str, 
                       arrival: str, 
@@ -93,13 +98,29 @@ Safari啟動失敗: {str(e)}
             'return_date': return_date
         }
         
+        # 已設定查詢端點時先直接以HTTP查詢，失敗才啟動瀏覽器
+        if scraper_http.is_enabled():
+            try:
+                with httpx.Client(
+                    headers=self.config.HEADERS,
+                    timeout=self.config.HTTP_TIMEOUT,
+                    follow_redirects=True
+                ) as client:
+                    return scraper_http.search_flights_sync(
+                        client, departure, arrival, departure_date, return_date
+                    )
+            except scraper_http.ScrapeError as e:
+                logger.warning(f"直接HTTP查詢失敗，改用瀏覽器: {str(e)}")
+        
         try:
             self.driver = self._setup_safari_driver()
             logger.info(f"開始搜尋航班: {departure} -> {arrival}, 日期: {departure_date}")
             
             # 訪問虎航網站
             self.driver.get(self.config.BASE_URL)
-            time.sleep(3)
+            self._wait(self.config.SELENIUM_TIMEOUT).until(
+                lambda driver: driver.execute_script("return document.readyState") != "loading"
+            )
             
             # 填寫搜尋表單（簡化版本）
             success = self._fill_search_form_safari(departure, arrival, departure_date, return_date)
@@ -107,8 +128,13 @@ Safari啟動失敗: {str(e)}
                 result.add_error("填寫搜尋表單失敗")
                 return result
             
-            # 等待搜尋結果載入
-            time.sleep(5)
+            # 等待搜尋結果載入，結果一出現就繼續
+            try:
+                self._wait(self.config.SELENIUM_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_READY_SELECTOR))
+                )
+            except TimeoutException:
+                logger.warning("等待航班結果載入超時，嘗試直接解析")
             
             # 解析航班資料（簡化版本）
             flights = self._parse_flight_results_safari()
@@ -135,7 +161,6 @@ Safari啟動失敗: {str(e)}
             # 這裡實作Safari專用的表單填寫邏輯
             # 先用簡單的模擬搜尋
             logger.info(f"模擬搜尋: {departure} -> {arrival} on {departure_date}")
-            time.sleep(2)
             return True
             
         except Exception as e:
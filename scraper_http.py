@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+虎航直接HTTP查詢
+
+略過瀏覽器，直接呼叫訂票網站背後的航班查詢JSON端點。
+端點網址需先用瀏覽器開發者工具（Network分頁）擷取，
+再設定於環境變數 TIGERAIR_API_SEARCH_URL。
+"""
+
+import logging
+from typing import List, Optional, Any, Dict
+
+import httpx
+
+from config import TigerairConfig
+from models import FlightInfo, FlightSearchResult
+
+logger = logging.getLogger(__name__)
+
+# 航班欄位在JSON中可能使用的鍵名
+FIELD_ALIASES = {
+    'flight_number': ('flightNumber', 'flight_number', 'flightNo'),
+    'departure_time': ('departureTime', 'departure_time', 'std'),
+    'arrival_time': ('arrivalTime', 'arrival_time', 'sta'),
+    'price': ('price', 'fare', 'totalPrice', 'amount'),
+    'seats_available': ('seatsAvailable', 'seats_available', 'available'),
+}
+
+# 可能包含航班列表的鍵名
+FLIGHT_LIST_KEYS = ('flights', 'journeys', 'items')
+
+# 代表遭到反爬蟲機制阻擋的HTTP狀態碼
+CHALLENGE_STATUS_CODES = (403, 429, 503)
+
+
+class ScrapeError(Exception):
+    """查詢航班失敗（無法連線、上游回傳錯誤或回應格式不符）"""
+
+
+class AntiBotChallenge(ScrapeError):
+    """網站回傳反爬蟲驗證頁面，需改用瀏覽器查詢"""
+
+
+def is_enabled() -> bool:
+    """是否已設定直接HTTP查詢端點"""
+    return bool(TigerairConfig.API_SEARCH_URL)
+
+
+def build_search_payload(departure: str, arrival: str,
+                         departure_date: str, return_date: Optional[str] = None) -> Dict[str, Any]:
+    """組成航班查詢請求內容"""
+    payload = {
+        'origin': departure,
+        'destination': arrival,
+        'departureDate': departure_date,
+        'adults': 1
+    }
+    if return_date:
+        payload['returnDate'] = return_date
+    return payload
+
+
+def _pick(item: Dict[str, Any], field: str) -> Any:
+    """依別名取出欄位值"""
+    for key in FIELD_ALIASES[field]:
+        if key in item:
+            return item[key]
+    return None
+
+
+def _normalize_time(value: Any) -> str:
+    """將 '2025-06-02T08:25:00' 或 '08:25' 轉為 HH:MM"""
+    if not value:
+        return ""
+    value = str(value)
+    if 'T' in value:
+        value = value.split('T', 1)[1]
+    return value[:5]
+
+
+def _build_hour_to_slot() -> List[str]:
+    """依設定的時間區間建立出發小時（0-23）對應時段的查表"""
+    hour_to_slot = ["未知"] * 24
+    for slot_name, (start, end) in TigerairConfig.get_time_slots().items():
+        start_hour = int(start.split(':')[0])
+        end_hour = int(end.split(':')[0])
+        if slot_name == "晚班":
+            end_hour = 24
+        for hour in range(start_hour, min(end_hour, 24)):
+            if hour_to_slot[hour] == "未知":
+                hour_to_slot[hour] = slot_name
+    return hour_to_slot
+
+
+# 出發小時對應的時段，模組載入時建立一次，與 TigerairScraper 共用
+HOUR_TO_SLOT = _build_hour_to_slot()
+
+
+def get_time_slot(time_str: str) -> str:
+    """判斷時間屬於哪個時段"""
+    try:
+        hour = int(time_str.partition(':')[0])
+    except ValueError:
+        return "未知"
+    if hour < 0:
+        return "未知"
+    # 超過23時的異常時間沿用最後一個小時的時段（晚班）
+    return HOUR_TO_SLOT[min(hour, 23)]
+
+
+def _find_flight_list(data: Any) -> List[Dict[str, Any]]:
+    """在回應JSON中尋找航班列表"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in FLIGHT_LIST_KEYS:
+            if isinstance(data.get(key), list):
+                return data[key]
+        if 'data' in data:
+            return _find_flight_list(data['data'])
+    return []
+
+
+def parse_flights_payload(data: Any, departure_date: str, source_url: str) -> List[FlightInfo]:
+    """將查詢端點回傳的JSON轉為航班資訊"""
+    flights = []
+
+    # 同一次回應的航班共用爬取時間戳記
+    with FlightInfo.batch_timestamp():
+        for item in _find_flight_list(data):
+            if not isinstance(item, dict):
+                continue
+
+            flight_number = _pick(item, 'flight_number')
+            if not flight_number:
+                continue
+
+            price = _pick(item, 'price')
+            if isinstance(price, dict):
+                price = price.get('amount')
+            try:
+                price = float(price) if price is not None else None
+            except (TypeError, ValueError):
+                price = None
+
+            seats_available = _pick(item, 'seats_available')
+            if seats_available is None:
+                seats_available = not item.get('soldOut', False)
+
+            flight_info = FlightInfo(
+                flight_number=str(flight_number).replace(' ', ''),
+                departure_time=_normalize_time(_pick(item, 'departure_time')),
+                arrival_time=_normalize_time(_pick(item, 'arrival_time')),
+                departure_date=departure_date,
+                price=price,
+                seats_available=bool(seats_available),
+                source_url=source_url
+            )
+            if flight_info.departure_time:
+                flight_info.time_slot = get_time_slot(flight_info.departure_time)
+
+            flights.append(flight_info)
+
+    return flights
+
+
+async def search_flights(client: httpx.AsyncClient,
+                         departure: str,
+                         arrival: str,
+                         departure_date: str,
+                         return_date: Optional[str] = None) -> FlightSearchResult:
+    """
+    直接呼叫查詢端點搜尋航班
+
+    Args:
+        client: 共用的 httpx.AsyncClient
+        departure: 出發機場代碼
+        arrival: 抵達機場代碼
+        departure_date: 出發日期 (YYYY-MM-DD)
+        return_date: 回程日期 (可選)
+
+    Returns:
+        FlightSearchResult: 搜尋結果
+
+    Raises:
+        AntiBotChallenge: 遭到反爬蟲機制阻擋，呼叫端應改用瀏覽器查詢
+        ScrapeError: 無法連線、上游回傳錯誤或回應格式不符
+    """
+    try:
+        response = await client.post(
+            TigerairConfig.API_SEARCH_URL,
+            json=build_search_payload(departure, arrival, departure_date, return_date),
+            headers={'Accept': 'application/json'}
+        )
+    except httpx.HTTPError as e:
+        raise ScrapeError(f"查詢端點連線失敗: {e}") from e
+
+    return _build_result(response, departure, arrival, departure_date, return_date)
+
+
+def search_flights_sync(client: httpx.Client,
+                        departure: str,
+                        arrival: str,
+                        departure_date: str,
+                        return_date: Optional[str] = None) -> FlightSearchResult:
+    """
+    search_flights 的同步版本，供以執行緒執行的瀏覽器爬蟲先行嘗試
+
+    Args:
+        client: 共用的 httpx.Client
+        其餘參數同 search_flights
+
+    Raises:
+        AntiBotChallenge: 遭到反爬蟲機制阻擋，呼叫端應改用瀏覽器查詢
+        ScrapeError: 無法連線、上游回傳錯誤或回應格式不符
+    """
+    try:
+        response = client.post(
+            TigerairConfig.API_SEARCH_URL,
+            json=build_search_payload(departure, arrival, departure_date, return_date),
+            headers={'Accept': 'application/json'}
+        )
+    except httpx.HTTPError as e:
+        raise ScrapeError(f"查詢端點連線失敗: {e}") from e
+
+    return _build_result(response, departure, arrival, departure_date, return_date)
+
+
+def _build_result(response: httpx.Response,
+                  departure: str,
+                  arrival: str,
+                  departure_date: str,
+                  return_date: Optional[str]) -> FlightSearchResult:
+    """檢查查詢端點的回應並轉為搜尋結果"""
+    result = FlightSearchResult()
+    result.search_params = {
+        'departure': departure,
+        'arrival': arrival,
+        'departure_date': departure_date,
+        'return_date': return_date
+    }
+
+    url = TigerairConfig.API_SEARCH_URL
+    content_type = response.headers.get('content-type', '')
+    if response.status_code in CHALLENGE_STATUS_CODES or 'json' not in content_type:
+        raise AntiBotChallenge(f"查詢端點回傳 {response.status_code} ({content_type})")
+    if response.is_error:
+        raise ScrapeError(f"查詢端點回傳 {response.status_code}")
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise ScrapeError(f"查詢端點回傳的JSON格式錯誤: {e}") from e
+
+    for flight in parse_flights_payload(data, departure_date, url):
+        result.add_flight(flight)
+
+    logger.info(f"HTTP查詢取得 {result.success_count} 筆航班: {departure} -> {arrival}, 日期: {departure_date}")
+    return result
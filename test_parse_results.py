@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+航班結果解析測試程式
+以固定的HTML測試巢狀結果容器與航班卡片的解析，不需要開啟瀏覽器
+"""
+
+from types import SimpleNamespace
+
+from tigerair_scraper import TigerairScraper
+
+# 外層結果容器與內層卡片的 class 都符合航班選擇器
+NESTED_RESULTS_HTML = """
+<html><body>
+<div class="flight-results">
+  <div class="flight-card">
+    <span>IT200</span> <span>08:25</span> <span>12:30</span> <span>NT$ 4,500</span>
+  </div>
+  <div class="flight-card">
+    <span>IT202</span> <span>14:10</span> <span>18:15</span> <span>NT$ 6,200</span> <span>售完</span>
+  </div>
+  <div class="flight-card">
+    <span>IT200</span> <span>08:25</span> <span>12:30</span> <span>NT$ 4,500</span>
+  </div>
+</div>
+</body></html>
+"""
+
+def test_nested_results():
+    """測試巢狀容器只從最內層卡片提取航班，且重複卡片只保留一筆"""
+    print("🧪 測試巢狀航班結果解析...")
+
+    scraper = TigerairScraper()
+    scraper.driver = SimpleNamespace(page_source=NESTED_RESULTS_HTML, current_url="https://www.tigerairtw.com/zh-tw/")
+    flights = scraper._parse_flight_results()
+
+    try:
+        assert [f.flight_number for f in flights] == ["IT200", "IT202"], flights
+
+        first, second = flights
+        assert (first.departure_time, first.arrival_time) == ("08:25", "12:30")
+        assert first.seats_available
+
+        assert (second.departure_time, second.arrival_time) == ("14:10", "18:15")
+        assert not second.seats_available
+    except AssertionError as e:
+        print(f"❌ 測試失敗: {e}")
+        return False
+
+    print(f"✅ 解析出 {len(flights)} 筆航班，時間與座位狀況皆來自各自的卡片")
+    return True
+
+if __name__ == "__main__":
+    success = test_nested_results()
+    raise SystemExit(0 if success else 1)
@@ -7,9 +7,10 @@
 """
 
 from chrome_fix_scraper import FixedChromeScraper
+from logging_setup import configure_logging
 import logging
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def test_real_prices():
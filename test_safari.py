@@ -7,9 +7,10 @@ Safari瀏覽器測試程式
 """
 
 from safari_scraper import SafariTigerairScraper
+from logging_setup import configure_logging
 import logging
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def test_safari():
@@ -1,9 +1,14 @@
-import time
+import asyncio
+import contextlib
+import csv
+import functools
+import random
 import re
 import logging
+from dataclasses import fields
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Tuple, Union
-import requests
+import httpx
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -14,39 +19,111 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.safari.options import Options as SafariOptions
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
-import pandas as pd
 import json
 import os
 
+try:
+    import orjson
+except ImportError:  # 未安裝orjson時改用標準函式庫json
+    orjson = None
+
 from config import TigerairConfig
 from models import FlightInfo, FlightSearchResult
+from cache import DiskCache
+import scraper_http
+from logging_setup import configure_logging
 
 # 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('tigerair_scraper.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+configure_logging('tigerair_scraper.log')
 logger = logging.getLogger(__name__)
 
+# 搜尋頁的表單：單程/來回選項或出發地輸入框出現即可開始填寫
+SEARCH_FORM_SELECTOR = "input[value='oneway'], input[value='return'], input[name*='origin'], input[placeholder*='出發地']"
+
+# 搜尋結果頁的航班元素，出現即表示結果已載入
+RESULT_READY_SELECTOR = ".flight-card, .flight-result, .flight-item"
+
+# 航班卡片/項目：class 含 flight、result、card 或 item 的 div 與 li
+FLIGHT_ELEMENT_SELECTOR = ', '.join(
+    f'{tag}[class*={keyword}]'
+    for tag in ('div', 'li')
+    for keyword in ('flight', 'result', 'card', 'item')
+)
+
+# 解析航班時使用的正規表示式，於模組載入時編譯一次
+FLIGHT_NUMBER_RE = re.compile(r'(IT\d+|TT\d+)')
+TIME_RE = re.compile(r'(\d{1,2}:\d{2})')
+PRICE_RE = re.compile(r'NT\$?\s*([0-9,]+)|TWD\s*([0-9,]+)|(\d{1,3}(?:,\d{3})*)')
+
+# CSV輸出欄位：航班資訊各欄位加上航線代碼
+CSV_FIELDNAMES = [field.name for field in fields(FlightInfo)] + ['route']
+
+def _innermost_elements(elements):
+    """
+    只保留不包含其他符合元素的元素（最內層的航班卡片）
+
+    外層結果容器也會符合選擇器，其文字混合了整頁航班，價格與座位狀況都不可靠。
+    """
+    matched = {id(element) for element in elements}
+    outer = set()
+    for element in elements:
+        for parent in element.parents:
+            if id(parent) in outer:
+                # 此祖先以上已由先前的元素標記過
+                break
+            if id(parent) in matched:
+                outer.add(id(parent))
+    return [element for element in elements if id(element) not in outer]
+
+@functools.lru_cache(maxsize=1)
+def _install_chromedriver() -> str:
+    """取得chromedriver路徑（必要時下載），結果在同一程序內共用，不必每次啟動都檢查"""
+    return ChromeDriverManager().install()
+
+@functools.lru_cache(maxsize=2)
+def _chrome_options(headless: bool) -> Options:
+    """建立Chrome選項；參數固定不變，依是否無頭模式各建立一次"""
+    chrome_options = Options()
+    
+    if headless:
+        chrome_options.add_argument('--headless')
+    
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    
+    # 不載入圖片，減少每次載入頁面的傳輸量
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    
+    # DOMContentLoaded後即返回，不等待圖片等資源
+    chrome_options.page_load_strategy = 'eager'
+    
+    return chrome_options
+
 class TigerairScraper:
     """虎航機票爬蟲類別"""
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, reuse_driver: bool = False):
         """
         初始化爬蟲
         
         Args:
             headless: 是否使用無頭模式運行瀏覽器
+            reuse_driver: 是否在多次搜尋之間保留瀏覽器（使用完畢需呼叫 close()）
         """
         self.config = TigerairConfig()
         self.headless = headless
+        self.reuse_driver = reuse_driver
         self.driver = None
-        self.session = requests.Session()
-        self.session.headers.update(self.config.HEADERS)
+        self._driver_uses = 0
+        self.http_client = None
+        self.disk_cache = None
         
         # 建立輸出目錄
         os.makedirs(self.config.OUTPUT_DIR, exist_ok=True)
@@ -55,24 +132,7 @@ class TigerairScraper:
         """設定瀏覽器驅動 - 優先使用Chrome"""
         try:
             # 首先嘗試使用Chrome（推薦，跨平台支援）
-            chrome_options = Options()
-            
-            if self.headless:
-                chrome_options.add_argument('--headless')
-            
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+            driver = self._setup_driver_chrome_only()
             logger.info("使用Chrome瀏覽器")
             return driver
             
@@ -88,7 +148,8 @@ class TigerairScraper:
                     
                 safari_options = webdriver.SafariOptions()
                 driver = webdriver.Safari(options=safari_options)
-                driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+                driver.implicitly_wait(0)
+                self._widen_connection_pool(driver)
                 logger.info("使用Safari瀏覽器")
                 return driver
                 
@@ -107,43 +168,34 @@ class TigerairScraper:
     
     def _setup_driver_chrome_only(self) -> webdriver.Chrome:
         """設定Chrome瀏覽器驅動"""
-        chrome_options = Options()
+        chrome_options = _chrome_options(self.headless)
         
-        if self.headless:
-            chrome_options.add_argument('--headless')
-        
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        service = Service(ChromeDriverManager().install())
+        service = Service(_install_chromedriver())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.implicitly_wait(self.config.IMPLICIT_WAIT)
+        # 元素查找都使用顯式等待，隱式等待會讓每次找不到元素時多等 IMPLICIT_WAIT 秒
+        driver.implicitly_wait(0)
+        self._widen_connection_pool(driver)
         
         return driver
     
+    def _widen_connection_pool(self, driver):
+        """
+        放大WebDriver指令連線池
+        
+        Selenium 4.15 的 RemoteConnection 以預設 maxsize=1 建立 urllib3 連線池，
+        同時送出多個指令時會出現 "Connection pool is full" 並重建連線。
+        此版本尚無 ClientConfig 可設定，因此直接調整連線池參數。
+        """
+        conn = getattr(driver.command_executor, '_conn', None)
+        if conn is None or not hasattr(conn, 'connection_pool_kw'):
+            return
+        conn.connection_pool_kw['maxsize'] = self.config.SELENIUM_POOL_SIZE
+        conn.clear()
+    
     def _get_time_slot(self, time_str: str) -> str:
-        """判斷時間屬於哪個時段"""
-        try:
-            hour = int(time_str.split(':')[0])
-            time_slots = self.config.get_time_slots()
-            
-            for slot_name, (start, end) in time_slots.items():
-                start_hour = int(start.split(':')[0])
-                end_hour = int(end.split(':')[0])
-                
-                if start_hour <= hour < end_hour or (slot_name == "晚班" and hour >= start_hour):
-                    return slot_name
-            
-            return "未知"
-        except:
-            return "未知"
+        """判斷時間屬於哪個時段（與直接HTTP查詢共用同一張查表）"""
+        return scraper_http.get_time_slot(time_str)
     
     def search_flights(self, 
                       departure: str, 
@@ -162,6 +214,37 @@ class TigerairScraper:
         Returns:
             FlightSearchResult: 搜尋結果
         """
+        # 存活時間內查詢過的組合直接使用磁碟快取
+        cache_key = self._cache_key(departure, arrival, departure_date, return_date)
+        result = self._load_cached(cache_key)
+        if result is not None:
+            return result
+        
+        # 已設定查詢端點時先直接以HTTP查詢，失敗才啟動瀏覽器
+        if scraper_http.is_enabled():
+            try:
+                result = scraper_http.search_flights_sync(
+                    self._get_http_client(), departure, arrival, departure_date, return_date
+                )
+            except scraper_http.ScrapeError as e:
+                logger.warning(f"直接HTTP查詢失敗，改用瀏覽器: {str(e)}")
+        
+        if result is None:
+            result = self.search_flights_with_browser(departure, arrival, departure_date, return_date)
+        
+        self._store_cached(cache_key, result)
+        return result
+    
+    def search_flights_with_browser(self,
+                                    departure: str,
+                                    arrival: str,
+                                    departure_date: str,
+                                    return_date: Optional[str] = None) -> FlightSearchResult:
+        """
+        以瀏覽器填寫表單搜尋航班（已先嘗試過直接HTTP查詢時使用）
+        
+        參數與回傳值同 search_flights
+        """
         result = FlightSearchResult()
         result.search_params = {
             'departure': departure,
@@ -171,12 +254,24 @@ class TigerairScraper:
         }
         
         try:
-            self.driver = self._setup_driver()
+            # 同一個瀏覽器使用一定次數後重新啟動，避免記憶體持續增加
+            if self.driver is not None and self._driver_uses >= self.config.DRIVER_MAX_USES:
+                self._close_driver()
+            if self.driver is None or not self.reuse_driver:
+                self.driver = self._setup_driver()
+                self._driver_uses = 0
+            self._driver_uses += 1
             logger.info(f"開始搜尋航班: {departure} -> {arrival}, 日期: {departure_date}")
             
-            # 訪問虎航網站
+            # 訪問虎航網站，搜尋表單出現即開始填寫
             self.driver.get(self.config.BASE_URL)
-            time.sleep(3)
+            try:
+                self._wait(self.config.SELENIUM_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, SEARCH_FORM_SELECTOR))
+                )
+            except TimeoutException:
+                result.add_error("搜尋頁面載入逾時，找不到搜尋表單")
+                return result
             
             # 填寫搜尋表單
             success = self._fill_search_form(departure, arrival, departure_date, return_date)
@@ -184,11 +279,17 @@ class TigerairScraper:
                 result.add_error("填寫搜尋表單失敗")
                 return result
             
-            # 等待搜尋結果載入
-            time.sleep(5)
+            # 等待航班結果載入（同網址更新結果的頁面也適用）
+            try:
+                self._wait(self.config.RESULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_READY_SELECTOR))
+                )
+            except TimeoutException:
+                logger.warning("等待航班結果載入超時，嘗試直接解析")
             
             # 解析航班資料
-            flights = self._parse_flight_results()
+            with FlightInfo.batch_timestamp():
+                flights = self._parse_flight_results()
             for flight in flights:
                 result.add_flight(flight)
             
@@ -198,13 +299,82 @@ class TigerairScraper:
             error_msg = f"搜尋航班時發生錯誤: {str(e)}"
             logger.error(error_msg)
             result.add_error(error_msg)
+            # 發生錯誤時不沿用可能已損壞的瀏覽器
+            self._close_driver()
         
         finally:
-            if self.driver:
-                self.driver.quit()
+            if not self.reuse_driver:
+                self._close_driver()
         
         return result
     
+    def _get_http_client(self) -> httpx.Client:
+        """取得直接HTTP查詢用的連線，多次查詢共用以保持連線"""
+        if self.http_client is None:
+            self.http_client = httpx.Client(
+                http2=True,
+                headers=self.config.HEADERS,
+                timeout=self.config.HTTP_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.config.HTTP_MAX_CONNECTIONS)
+            )
+        return self.http_client
+    
+    @staticmethod
+    def _cache_key(departure: str, arrival: str, departure_date: str,
+                   return_date: Optional[str] = None) -> str:
+        """磁碟快取的鍵"""
+        return f"{departure}:{arrival}:{departure_date}:{return_date or ''}"
+    
+    def _get_disk_cache(self) -> Optional[DiskCache]:
+        """取得查詢結果的磁碟快取，SEARCH_CACHE_TTL 為0時停用"""
+        if self.disk_cache is None and self.config.SEARCH_CACHE_TTL > 0:
+            self.disk_cache = DiskCache(self.config.SEARCH_CACHE_FILE, self.config.SEARCH_CACHE_TTL)
+        return self.disk_cache
+    
+    def _load_cached(self, cache_key: str) -> Optional[FlightSearchResult]:
+        """讀取磁碟快取中的搜尋結果，沒有或已過期則回傳None"""
+        disk_cache = self._get_disk_cache()
+        if disk_cache is None:
+            return None
+        value = disk_cache.get(cache_key)
+        if value is None:
+            return None
+        logger.info(f"使用快取的搜尋結果: {cache_key}")
+        return FlightSearchResult.from_dict(json.loads(value))
+    
+    def _store_cached(self, cache_key: str, result: FlightSearchResult):
+        """將沒有錯誤的搜尋結果寫入磁碟快取"""
+        disk_cache = self._get_disk_cache()
+        if disk_cache is not None and not result.errors:
+            disk_cache.set(cache_key, result.to_json())
+    
+    def close(self):
+        """關閉瀏覽器、HTTP連線與磁碟快取"""
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+            self.disk_cache = None
+        if self.http_client is not None:
+            self.http_client.close()
+            self.http_client = None
+        self._close_driver()
+    
+    def _close_driver(self):
+        """關閉瀏覽器（HTTP連線與磁碟快取保留給之後的查詢）"""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+    
+    def _wait(self, timeout: float) -> WebDriverWait:
+        """建立以較短間隔輪詢的顯式等待，條件一成立就立即繼續"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.config.SELENIUM_POLL_FREQUENCY)
+    
+    def _find(self, selector: str):
+        """等待符合選擇器的元素可見且可操作（取代原本的隱式等待與固定暫停）"""
+        return self._wait(self.config.IMPLICIT_WAIT).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+        )
+    
     def _fill_search_form(self, departure: str, arrival: str, 
                          departure_date: str, return_date: Optional[str] = None) -> bool:
         """填寫搜尋表單"""
@@ -212,46 +382,40 @@ class TigerairScraper:
             # 點擊單程/來回選項
             if return_date:
                 # 來回票
-                round_trip_radio = WebDriverWait(self.driver, 10).until(
+                round_trip_radio = self._wait(10).until(
                     EC.element_to_be_clickable((By.CSS_SELECTOR, "input[value='return']"))
                 )
                 round_trip_radio.click()
             else:
                 # 單程票
-                one_way_radio = WebDriverWait(self.driver, 10).until(
+                one_way_radio = self._wait(10).until(
                     EC.element_to_be_clickable((By.CSS_SELECTOR, "input[value='oneway']"))
                 )
                 one_way_radio.click()
             
-            time.sleep(1)
-            
             # 選擇出發地
-            departure_input = self.driver.find_element(By.CSS_SELECTOR, "input[name*='origin'], input[placeholder*='出發地']")
+            departure_input = self._find("input[name*='origin'], input[placeholder*='出發地']")
             departure_input.clear()
             departure_input.send_keys(departure)
-            time.sleep(1)
             
             # 選擇目的地
-            arrival_input = self.driver.find_element(By.CSS_SELECTOR, "input[name*='destination'], input[placeholder*='目的地']")
+            arrival_input = self._find("input[name*='destination'], input[placeholder*='目的地']")
             arrival_input.clear()
             arrival_input.send_keys(arrival)
-            time.sleep(1)
             
             # 設定出發日期
-            departure_date_input = self.driver.find_element(By.CSS_SELECTOR, "input[name*='departure'], input[placeholder*='出發']")
+            departure_date_input = self._find("input[name*='departure'], input[placeholder*='出發']")
             departure_date_input.clear()
             departure_date_input.send_keys(departure_date)
-            time.sleep(1)
             
             # 如果是來回票，設定回程日期
             if return_date:
-                return_date_input = self.driver.find_element(By.CSS_SELECTOR, "input[name*='return'], input[placeholder*='回程']")
+                return_date_input = self._find("input[name*='return'], input[placeholder*='回程']")
                 return_date_input.clear()
                 return_date_input.send_keys(return_date)
-                time.sleep(1)
             
             # 點擊搜尋按鈕
-            search_button = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit'], .search-button, .btn-search")
+            search_button = self._find("button[type='submit'], .search-button, .btn-search")
             search_button.click()
             
             return True
@@ -261,68 +425,61 @@ class TigerairScraper:
             return False
     
     def _parse_flight_results(self) -> List[FlightInfo]:
-        """解析航班搜尋結果"""
+        """解析目前頁面的航班搜尋結果（呼叫端已等待結果載入）"""
         flights = []
         
         try:
-            # 等待結果載入
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".flight-card, .flight-result, .flight-item"))
-            )
-            
             # 取得頁面源碼並用BeautifulSoup解析
             page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            soup = BeautifulSoup(page_source, 'lxml')
             
             # 尋找航班卡片/項目
-            flight_elements = soup.find_all(['div', 'li'], class_=re.compile(r'flight|result|card|item'))
-            
-            for element in flight_elements:
-                flight_info = self._extract_flight_info(element)
-                if flight_info and flight_info.flight_number:
-                    flights.append(flight_info)
-            
-        except TimeoutException:
-            logger.warning("等待航班結果載入超時，嘗試直接解析")
-            # 如果等待超時，嘗試直接解析現有內容
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            flight_elements = soup.find_all(['div', 'li'])
-            
-            for element in flight_elements:
-                if self._is_flight_element(element):
-                    flight_info = self._extract_flight_info(element)
-                    if flight_info and flight_info.flight_number:
-                        flights.append(flight_info)
+            flights = self._collect_flights(soup.select(FLIGHT_ELEMENT_SELECTOR))
         
         except Exception as e:
             logger.error(f"解析航班結果失敗: {str(e)}")
         
         return flights
     
-    def _is_flight_element(self, element) -> bool:
-        """判斷元素是否為航班資訊元素"""
-        text = element.get_text().lower()
-        return any(keyword in text for keyword in ['flight', 'it', 'tit', '航班', '起飛', '降落', '票價'])
+    def _collect_flights(self, flight_elements) -> List[FlightInfo]:
+        """
+        從航班元素提取航班資訊並去除重複
+        
+        巢狀的容器/卡片元素會同時符合選擇器，只從最內層的卡片提取；
+        同一航班仍出現多張卡片時，以 (航班號碼, 起飛時間) 判斷，只保留第一次出現的。
+        """
+        flights = []
+        seen = set()
+        # 同一頁面的航班共用來源網址，不必每個元素都向瀏覽器查詢一次
+        source_url = self.driver.current_url
+        for element in _innermost_elements(flight_elements):
+            flight_info = self._extract_flight_info(element, source_url)
+            if not (flight_info and flight_info.flight_number):
+                continue
+            key = (flight_info.flight_number, flight_info.departure_time)
+            if key in seen:
+                continue
+            seen.add(key)
+            flights.append(flight_info)
+        return flights
     
-    def _extract_flight_info(self, element) -> Optional[FlightInfo]:
+    def _extract_flight_info(self, element, source_url: str) -> Optional[FlightInfo]:
         """從HTML元素中提取航班資訊"""
         try:
             text = element.get_text()
             
             # 提取航班號碼
-            flight_number_match = re.search(r'(IT\d+|TT\d+)', text)
+            flight_number_match = FLIGHT_NUMBER_RE.search(text)
             if not flight_number_match:
                 return None
             
             flight_number = flight_number_match.group(1)
             
             # 提取時間資訊
-            time_pattern = r'(\d{1,2}:\d{2})'
-            times = re.findall(time_pattern, text)
+            times = TIME_RE.findall(text)
             
             # 提取價格資訊
-            price_pattern = r'NT\$?\s*([0-9,]+)|TWD\s*([0-9,]+)|(\d{1,3}(?:,\d{3})*)'
-            price_match = re.search(price_pattern, text)
+            price_match = PRICE_RE.search(text)
             price = None
             if price_match:
                 price_str = price_match.group(1) or price_match.group(2) or price_match.group(3)
@@ -343,7 +500,7 @@ class TigerairScraper:
                 arrival_time=times[1] if len(times) >= 2 else "",
                 price=price,
                 seats_available=seats_available,
-                source_url=self.driver.current_url
+                source_url=source_url
             )
             
             # 設定時間區間
@@ -360,7 +517,7 @@ class TigerairScraper:
                              routes: List[str], 
                              dates: List[str]) -> Dict[str, FlightSearchResult]:
         """
-        搜尋多條航線的航班
+        搜尋多條航線的航班（search_multiple_routes_async 的同步版本，不可在事件迴圈中呼叫）
         
         Args:
             routes: 航線列表 (如 ['TPE_NRT', 'TPE_KIX'])
@@ -369,46 +526,123 @@ class TigerairScraper:
         Returns:
             Dict[str, FlightSearchResult]: 各航線的搜尋結果
         """
-        results = {}
+        return asyncio.run(self.search_multiple_routes_async(routes, dates))
+    
+    async def search_multiple_routes_async(self,
+                                           routes: List[str],
+                                           dates: List[str]) -> Dict[str, FlightSearchResult]:
+        """
+        同時搜尋多條航線的航班
+        
+        直接HTTP查詢最多同時進行 HTTP_CONCURRENCY 個；改用瀏覽器的查詢由 BROWSER_POOL_SIZE 個
+        重複使用的瀏覽器分擔。每次查詢前隨機延遲，避免查詢過於密集被封鎖。
         
+        Args:
+            routes: 航線列表 (如 ['TPE_NRT', 'TPE_KIX'])
+            dates: 日期列表
+            
+        Returns:
+            Dict[str, FlightSearchResult]: 各航線的搜尋結果
+        """
+        known_routes = []
         for route in routes:
-            if route not in self.config.ROUTES:
+            if route in self.config.ROUTE_KEYS:
+                known_routes.append(route)
+            else:
                 logger.warning(f"未知航線: {route}")
-                continue
-            
+        
+        pairs = [(route, date) for route in known_routes for date in dates]
+        semaphore = asyncio.Semaphore(self.config.HTTP_CONCURRENCY)
+        
+        # 需改用瀏覽器的查詢向爬蟲池借用爬蟲，每個爬蟲保留自己的瀏覽器重複使用；
+        # 後進先出，查詢不多時只會啟動少數瀏覽器
+        browser_pool = asyncio.LifoQueue()
+        browser_scrapers = [
+            TigerairScraper(headless=self.headless, reuse_driver=True)
+            for _ in range(self.config.BROWSER_POOL_SIZE)
+        ]
+        for scraper in browser_scrapers:
+            browser_pool.put_nowait(scraper)
+        
+        async def search_one(client: Optional[httpx.AsyncClient], route: str, date: str) -> FlightSearchResult:
             route_info = self.config.ROUTES[route]
-            departure = route_info["from"]
-            arrival = route_info["to"]
-            route_name = route_info["route_name"]
-            
-            logger.info(f"開始搜尋航線: {route_name}")
+            departure, arrival = route_info["from"], route_info["to"]
             
-            route_results = FlightSearchResult()
-            route_results.search_params['route'] = route_name
+            cache_key = self._cache_key(departure, arrival, date)
+            result = self._load_cached(cache_key)
+            if result is not None:
+                return result
             
-            for date in dates:
+            if client is not None:
+                async with semaphore:
+                    await asyncio.sleep(random.uniform(*self.config.SCRAPE_JITTER))
+                    try:
+                        result = await scraper_http.search_flights(client, departure, arrival, date)
+                    except scraper_http.ScrapeError as e:
+                        logger.warning(f"直接HTTP查詢失敗，改用瀏覽器: {str(e)}")
+            
+            if result is None:
+                # 每個瀏覽器一次只能執行一個查詢
+                scraper = await browser_pool.get()
                 try:
-                    daily_result = self.search_flights(departure, arrival, date)
-                    
-                    # 合併結果
-                    for flight in daily_result.flights:
-                        flight.departure_date = date
-                        route_results.add_flight(flight)
-                    
-                    # 合併錯誤
-                    for error in daily_result.errors:
-                        route_results.add_error(f"{date}: {error}")
-                    
-                    # 延遲避免被封鎖
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    error_msg = f"搜尋 {route_name} {date} 失敗: {str(e)}"
-                    logger.error(error_msg)
-                    route_results.add_error(error_msg)
+                    await asyncio.sleep(random.uniform(*self.config.SCRAPE_JITTER))
+                    result = await asyncio.to_thread(
+                        scraper.search_flights_with_browser, departure, arrival, date
+                    )
+                finally:
+                    browser_pool.put_nowait(scraper)
+            
+            self._store_cached(cache_key, result)
+            return result
+        
+        for route in known_routes:
+            logger.info(f"開始搜尋航線: {self.config.ROUTES[route]['route_name']}")
+        
+        if scraper_http.is_enabled():
+            # 以HTTP/2在同一條連線上多工傳送各航線的查詢，省去重複的TLS交握
+            client_context = httpx.AsyncClient(
+                http2=True,
+                headers=self.config.HEADERS,
+                timeout=self.config.HTTP_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.config.HTTP_MAX_CONNECTIONS)
+            )
+        else:
+            client_context = contextlib.nullcontext()
+        
+        try:
+            async with client_context as client:
+                outcomes = await asyncio.gather(
+                    *(search_one(client, route, date) for route, date in pairs),
+                    return_exceptions=True
+                )
+        finally:
+            for scraper in browser_scrapers:
+                await asyncio.to_thread(scraper.close)
+        
+        # 依航線合併結果
+        results = {}
+        for route in known_routes:
+            route_results = results[route] = FlightSearchResult()
+            route_results.search_params['route'] = self.config.ROUTES[route]["route_name"]
+        
+        for (route, date), outcome in zip(pairs, outcomes):
+            route_results = results[route]
             
-            results[route] = route_results
-            logger.info(f"完成搜尋航線: {route_name}, 共 {route_results.success_count} 筆資料")
+            if isinstance(outcome, Exception):
+                error_msg = f"搜尋 {route_results.search_params['route']} {date} 失敗: {str(outcome)}"
+                logger.error(error_msg)
+                route_results.add_error(error_msg)
+                continue
+            
+            for flight in outcome.flights:
+                flight.departure_date = date
+                route_results.add_flight(flight)
+            for error in outcome.errors:
+                route_results.add_error(f"{date}: {error}")
+        
+        for route_results in results.values():
+            logger.info(f"完成搜尋航線: {route_results.search_params['route']}, 共 {route_results.success_count} 筆資料")
         
         return results
     
@@ -428,15 +662,8 @@ class TigerairScraper:
         file_paths = {}
         
         try:
-            # 合併所有結果
-            all_flights = []
-            for route, result in results.items():
-                for flight in result.flights:
-                    flight_dict = flight.to_dict()
-                    flight_dict['route'] = route
-                    all_flights.append(flight_dict)
-            
-            if not all_flights:
+            total_flights = sum(len(result.flights) for result in results.values())
+            if not total_flights:
                 logger.warning("沒有航班資料可儲存")
                 return file_paths
             
@@ -445,8 +672,15 @@ class TigerairScraper:
                 csv_filename = f"tigerair_flights_{timestamp}.csv"
                 csv_path = os.path.join(self.config.OUTPUT_DIR, csv_filename)
                 
-                df = pd.DataFrame(all_flights)
-                df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+                # 逐筆寫入，不必先把所有航班合併成一份表格
+                with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, lineterminator='\n')
+                    writer.writeheader()
+                    for route, result in results.items():
+                        for flight in result.flights:
+                            flight_dict = flight.to_dict()
+                            flight_dict['route'] = route
+                            writer.writerow(flight_dict)
                 file_paths['csv'] = csv_path
                 logger.info(f"CSV檔案已儲存: {csv_path}")
             
@@ -457,11 +691,11 @@ class TigerairScraper:
                 
                 output_data = {
                     'timestamp': timestamp,
-                    'total_flights': len(all_flights),
+                    'total_flights': total_flights,
                     'routes': {route: result.to_dict() for route, result in results.items()},
                     'summary': {
                         'total_routes': len(results),
-                        'total_flights': len(all_flights),
+                        'total_flights': total_flights,
                         'routes_summary': {
                             route: {
                                 'flight_count': result.success_count,
@@ -471,8 +705,20 @@ class TigerairScraper:
                     }
                 }
                 
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(output_data, f, ensure_ascii=False, indent=2)
+                # 預設輸出精簡格式，除錯時（JSON_PRETTY）才縮排
+                pretty = self.config.JSON_PRETTY
+                if orjson is not None:
+                    option = orjson.OPT_NON_STR_KEYS
+                    if pretty:
+                        option |= orjson.OPT_INDENT_2
+                    with open(json_path, 'wb') as f:
+                        f.write(orjson.dumps(output_data, option=option))
+                else:
+                    with open(json_path, 'w', encoding='utf-8') as f:
+                        if pretty:
+                            json.dump(output_data, f, ensure_ascii=False, indent=2)
+                        else:
+                            json.dump(output_data, f, ensure_ascii=False, separators=(',', ':'))
                 
                 file_paths['json'] = json_path
                 logger.info(f"JSON檔案已儲存: {json_path}")